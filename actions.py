@@ -8,25 +8,28 @@ Note: The actions performed only work if being run in the Sway WM, on Linux. Fee
 """
 
 import math
-import subprocess
 
 import cv2
 
+from common.dispatch import get_dispatcher
+from common.gestures import PINCH, PINCH_POINTER, get_features
 from common.hands import (
-    EasyHandLandmarker,
     dist_between,
-    draw_landmarks,
     fraction_to_pixels,
-    get_pinch_pointer,
-    is_pinch,
 )
+from common.runtime import GestureApp, Runtime
+from common.sway import get_sway
 
+# strings are sway commands, sent in the background (see common/dispatch.py);
+# functions are run right away in the frame loop
 ACTIONS = {
-    "r": ("prev desktop", lambda: subprocess.run(["swaymsg", "workspace", "prev"])),
-    "l": ("next desktop", lambda: subprocess.run(["swaymsg", "workspace", "next"])),
-    "d": ("hide all windows", lambda: subprocess.run(["swaymsg", "workspace", "11"])),
+    "r": ("prev desktop", "workspace prev"),
+    "l": ("next desktop", "workspace next"),
+    "d": ("hide all windows", "workspace 11"),
     "u": ("exit", lambda: exit(0)),
 }
+# frames a released pinch is given before the gesture is cancelled
+CONFIRM_FRAMES = 5
 
 
 def get_direction(ox, oy, px, py):
@@ -36,105 +39,90 @@ def get_direction(ox, oy, px, py):
     return direction
 
 
-# Initialize OpenCV
-landmarker = EasyHandLandmarker(num_hands=1)
-cap = cv2.VideoCapture(2)  # Use 0 for the default camera
-gesture_origin = None
-last_pointer = None
-was_triggered = False
-confirm_frame = 5
-is_exit = False
-
-while cap.isOpened():
-    ret, frame = cap.read()
-    if not ret:
-        break
-
-    frame = cv2.flip(frame, 1)
-    landmarker.process_frame(frame)
-
-    # Process the frame with MediaPipe Hands
-    results = landmarker.get_latest_result()
-
-    if results:
-        draw_landmarks(frame, results)
-        for landmarks in results.hand_landmarks:
-            if is_pinch(landmarks):
-                if was_triggered:
-                    continue
-                last_pointer = get_pinch_pointer(landmarks)
-                last_pointer = fraction_to_pixels(
-                    frame, last_pointer[0], last_pointer[1]
-                )
-                if gesture_origin is None:
-                    gesture_origin = last_pointer
-
-                ox, oy = gesture_origin
-                px, py = last_pointer
-
-                angle = math.atan2(py - oy, px - ox)
-                direction = get_direction(ox, oy, px, py)
-                action = ACTIONS[direction][0]
-
-                cv2.putText(
-                    frame, action, (10, 50), cv2.FONT_HERSHEY_DUPLEX, 1, (255, 0, 0), 2
-                )
-                frame = cv2.line(
-                    frame,
-                    (int(gesture_origin[0]), int(gesture_origin[1])),
-                    (
-                        int(gesture_origin[0] + 200 * math.cos(angle)),
-                        int(gesture_origin[1] + 200 * math.sin(angle)),
-                    ),
-                    (255, 0, 0),
-                    10,
-                )
-
-                frame = cv2.line(
-                    frame,
-                    (int(gesture_origin[0]), int(gesture_origin[1])),
-                    (int(last_pointer[0]), int(last_pointer[1])),
-                    (0, 0, 255),
-                    10,
-                )
-
-                confirm_frames = 5
-
-                if dist_between(ox, oy, px, py) > 200:
-                    direction = get_direction(ox, oy, px, py)
-
-                    ACTIONS[direction][1]()
-                    print(direction)
-
-                    gesture_origin = None
-                    last_pointer = None
-                    was_triggered = True
-                    continue
-
-            elif gesture_origin is not None:
-                confirm_frame -= 1
-                if confirm_frame > 0:
-                    continue
-
-                print("cancel")
-
-                gesture_origin = None
-                last_pointer = None
-                confirm_frames = 5
-            elif was_triggered:
-                was_triggered = False
-
-    if is_exit:
-        break
-
-    # Display the resulting frame
-    cv2.imshow("handiwork", frame)
-
-    # Break the loop if 'q' is pressed
-    if cv2.waitKey(1) & 0xFF == ord("q"):
-        break
-
-# Release the VideoCapture and close all windows
-cap.release()
-cv2.destroyAllWindows()
-landmarker.close()
+class ActionsApp(GestureApp):
+    num_hands = 1
+
+    def __init__(self):
+        self.gesture_origin = None
+        self.last_pointer = None
+        self.was_triggered = False
+        self.confirm_frame = CONFIRM_FRAMES
+        # (origin, pointer, angle, action) of the gesture drawn this frame
+        self.indicator = None
+
+    def update(self, frame, points):
+        self.indicator = None
+        features = get_features(points)
+        for is_pinching, pointer in zip(features[PINCH], features[PINCH_POINTER]):
+            self.handle_hand(frame, is_pinching, pointer)
+
+    def handle_hand(self, frame, is_pinching, pointer):
+        if is_pinching:
+            if self.was_triggered:
+                return
+            self.last_pointer = fraction_to_pixels(frame, pointer[0], pointer[1])
+            if self.gesture_origin is None:
+                self.gesture_origin = self.last_pointer
+
+            ox, oy = self.gesture_origin
+            px, py = self.last_pointer
+
+            angle = math.atan2(py - oy, px - ox)
+            direction = get_direction(ox, oy, px, py)
+            self.indicator = (
+                self.gesture_origin,
+                self.last_pointer,
+                angle,
+                ACTIONS[direction][0],
+            )
+            self.confirm_frame = CONFIRM_FRAMES
+
+            if dist_between(ox, oy, px, py) > 200:
+                action = ACTIONS[direction][1]
+                if callable(action):
+                    action()
+                else:
+                    get_dispatcher().submit(
+                        direction, lambda: get_sway().command(action)
+                    )
+                print(direction)
+
+                self.gesture_origin = None
+                self.last_pointer = None
+                self.was_triggered = True
+
+        elif self.gesture_origin is not None:
+            self.confirm_frame -= 1
+            if self.confirm_frame > 0:
+                return
+
+            print("cancel")
+
+            self.gesture_origin = None
+            self.last_pointer = None
+            self.confirm_frame = CONFIRM_FRAMES
+        elif self.was_triggered:
+            self.was_triggered = False
+
+    def render(self, frame):
+        if self.indicator is None:
+            return
+
+        (ox, oy), (px, py), angle, action = self.indicator
+        cv2.putText(frame, action, (10, 50), cv2.FONT_HERSHEY_DUPLEX, 1, (255, 0, 0), 2)
+        cv2.line(
+            frame,
+            (int(ox), int(oy)),
+            (int(ox + 200 * math.cos(angle)), int(oy + 200 * math.sin(angle))),
+            (255, 0, 0),
+            10,
+        )
+        cv2.line(frame, (int(ox), int(oy)), (int(px), int(py)), (0, 0, 255), 10)
+
+
+def create_app():
+    return ActionsApp()
+
+
+if __name__ == "__main__":
+    Runtime([create_app()]).run()
@@ -2,23 +2,24 @@
 BALL
 ------
 
-Play with the ball! Pinch to hold, drag and then release to throw.
+Play with the balls! Pinch to hold, drag and then release to throw. Balls bump
+into each other, and a held ball knocks the others about.
 
-Tip: Modify the NUM_BALLS constant below :)
+Tip: Modify the NUM_BALLS constant below :) (up to MAX_BALLS)
 """
 
 import random
+import time
 
 import cv2
+import numpy as np
 
-from common.hands import (
-    EasyHandLandmarker,
-    dist_between_squared,
-    draw_landmarks,
-    fraction_to_pixels,
-    get_pinch_pointer,
-    is_pinch,
-)
+from common.gestures import PINCH, PINCH_POINTER, get_features
+from common.hands import fraction_to_pixels
+from common.hittest import GRABBED, RELEASED, HitIndex, PinchGrabs
+from common.physics import REFERENCE_RATE, BallWorld
+from common.runtime import GestureApp, Runtime
+from common.tracking import get_hand_tracker
 
 GRAVITY = 3
 BOUNCE_DAMPING = 0.3
@@ -26,122 +27,114 @@ HORIZONTAL_RESISTANCE = 0.05
 RELEASE_SENSITIVITY = 1
 BALL_RADIUS = 40
 NUM_BALLS = 1
-
-
-landmarker = EasyHandLandmarker(num_hands=1)
-
-
-class Ball:
-    def __init__(self, x, y, r):
-        self.x = x
-        self.y = y
-        self.r = r
-        self.vy = 0
-        self.vx = 20
-        self.is_grabbing = False
-        self.grab_delta_x = 0
-        self.grab_delta_y = 0
-        self.last_grab_x = 0
-        self.last_grab_y = 0
-
-    def handle_hand(self, handmarks):
-        is_pinching = is_pinch(handmarks)
-        pointer = get_pinch_pointer(handmarks)
-        px, py = fraction_to_pixels(frame, *pointer)
-        if is_pinching and not self.is_grabbing:
-            self.is_grabbing = dist_between_squared(px, py, self.x, self.y) <= self.r**2
-
-            if self.is_grabbing:
-                self.last_grab_x = px
-                self.last_grab_y = py
-                self.grab_delta_x = self.x - px
-                self.grab_delta_y = self.y - py
-
-        elif is_pinching and self.is_grabbing:
-            self.x = px + self.grab_delta_x
-            self.y = py + self.grab_delta_y
-            self.last_grab_x = px
-            self.last_grab_y = py
-        elif self.is_grabbing:
-            self.vx = px - self.last_grab_x
-            self.vy = py - self.last_grab_y
-            self.is_grabbing = False
-
-    def update(self, frame):
-        if self.is_grabbing:
+# about the most balls a physics step handles within a 60 Hz frame on one
+# core, see common/physics.py
+MAX_BALLS = 2000
+
+
+class BallApp(GestureApp):
+    def __init__(self, world):
+        self.world = world
+        # each ball is a circle keyed by its index
+        self.index = HitIndex(cell_size=4 * world.radii.max())
+        self.grabs = PinchGrabs(self.index)
+        # where each held ball is relative to the hand holding it
+        self.grab_offsets = np.zeros_like(world.positions)
+        # track ID -> the hand's pointer position, the capture time of the
+        # result it came from, and its velocity
+        self.pointers = {}
+        self.last_update = None
+
+    def handle_hand(self, hand_id, is_pinching, pointer, seen):
+        world = self.world
+        last_pointer, last_seen, velocity = self.pointers.get(
+            hand_id, (pointer, seen, np.zeros(2))
+        )
+        # the same result is handed over every frame until inference catches
+        # up, so the velocity is only measured between results, by when
+        # their frames were captured
+        if seen > last_seen:
+            # in pixels per reference tick, like the world's velocities
+            velocity = (
+                (pointer - last_pointer)
+                / (seen - last_seen)
+                / REFERENCE_RATE
+                * RELEASE_SENSITIVITY
+            )
+        self.pointers[hand_id] = (pointer, seen, velocity)
+
+        grab = self.grabs.update(hand_id, is_pinching, pointer)
+        if grab is None:
             return
+        ball = grab.key
+        # held balls hit others as hard as they're moving, and are thrown
+        # with the hand's speed
+        world.velocities[ball] = velocity
+        if grab.state == RELEASED:
+            return
+        if grab.state == GRABBED:
+            self.grab_offsets[ball] = world.positions[ball] - pointer
+        world.positions[ball] = pointer + self.grab_offsets[ball]
+
+    def update(self, frame, points):
+        now = time.monotonic()
+        height, width, _ = frame.shape
+        self.world.size = (width, height)
+        self.index.set_circles(
+            range(len(self.world)), self.world.positions, self.world.radii
+        )
 
-        screen_height, screen_width, _ = frame.shape
-        self.vy += GRAVITY
-        self.vx -= self.vx * HORIZONTAL_RESISTANCE
-
-        if self.x - self.r + self.vx < 0 or self.x + self.r + self.vx > screen_width:
-            self.vx *= -1
-        if self.y + self.r + self.vy > screen_height:
-            self.vy *= -1 * (1 - BOUNCE_DAMPING)
-        if self.y - self.r + self.vy < 0:
-            self.vy *= -1
-
-        self.y += self.vy
-        self.x += self.vx
+        tracker = get_hand_tracker()
+        features = get_features(points)
+        for hand_id, is_pinching, pointer in zip(
+            tracker.ids, features[PINCH], features[PINCH_POINTER]
+        ):
+            pointer = np.array(fraction_to_pixels(frame, *pointer), dtype=np.float64)
+            self.handle_hand(hand_id, is_pinching, pointer, tracker.time)
+
+        # a hand that left for good drops whatever it was holding
+        for ball in self.grabs.drop(tracker.lost):
+            self.world.velocities[ball] = 0
+        for hand_id in tracker.lost:
+            self.pointers.pop(hand_id, None)
+
+        self.world.held[:] = False
+        self.world.held[list(self.grabs.holding.values())] = True
+        if self.last_update is not None:
+            self.world.advance(now - self.last_update)
+        self.last_update = now
 
     def render(self, frame):
-        frame = cv2.circle(
-            frame,
-            (int(self.x), int(self.y)),
-            self.r,
-            (0, 255, 0) if self.is_grabbing else (0, 0, 255),
-            -1,
+        for (x, y), r, is_held in zip(
+            self.world.positions.astype(int),
+            self.world.radii.astype(int),
+            self.world.held,
+        ):
+            cv2.circle(frame, (x, y), r, (0, 255, 0) if is_held else (0, 0, 255), -1)
+            cv2.circle(frame, (x, y), r, (0, 0, 0), 2)
+
+
+def create_app():
+    num_balls = min(NUM_BALLS, MAX_BALLS)
+    if num_balls < NUM_BALLS:
+        print(f"only using {num_balls} of the {NUM_BALLS} balls (see MAX_BALLS)")
+    positions = [
+        (random.randint(BALL_RADIUS, 500), random.randint(BALL_RADIUS, 500))
+        for _ in range(num_balls)
+    ]
+    return BallApp(
+        BallWorld(
+            # the frame's size replaces this on the first update
+            (640, 480),
+            positions,
+            BALL_RADIUS,
+            velocities=[(20, 0)] * num_balls,
+            gravity=GRAVITY,
+            bounce_damping=BOUNCE_DAMPING,
+            horizontal_resistance=HORIZONTAL_RESISTANCE,
         )
-        frame = cv2.circle(
-            frame,
-            (int(self.x), int(self.y)),
-            self.r,
-            (0, 0, 0),
-            2,
-        )
-        return frame
-
-
-# Initialize OpenCV
-cap = cv2.VideoCapture(2)  # Use 0 for the default camera
-balls = [
-    Ball(
-        random.randint(BALL_RADIUS, 500), random.randint(BALL_RADIUS, 500), BALL_RADIUS
     )
-    for _ in range(NUM_BALLS)
-]
-
-while cap.isOpened():
-    ret, frame = cap.read()
-    if not ret:
-        break
-
-    frame = cv2.flip(frame, 1)
-
-    landmarker.process_frame(frame)
-
-    for ball in balls:
-        frame = ball.render(frame)
-
-    results = landmarker.get_latest_result()
-    if results:
-        draw_landmarks(frame, results)
-        for landmarks in results.hand_landmarks:
-            for ball in balls:
-                ball.handle_hand(landmarks)
-
-    for ball in balls:
-        ball.update(frame)
-
-    # Display the resulting frame
-    cv2.imshow("handiwork", frame)
 
-    # Break the loop if 'q' is pressed
-    if cv2.waitKey(1) & 0xFF == ord("q"):
-        break
 
-# Release the VideoCapture and close all windows
-cap.release()
-cv2.destroyAllWindows()
-landmarker.close()
+if __name__ == "__main__":
+    Runtime([create_app()]).run()
@@ -5,44 +5,32 @@ BINARY COUNTING
 Count in binary with your hands! Each finger represents a bit - the pinky represents 2 ** 0, the ring finger represents 2 ** 1, and so on.
 """
 
-import math
-
 import cv2
 import mediapipe as mp
 
-from common.hands import EasyHandLandmarker, draw_landmarks, fingers_are_up
+from common.gestures import FINGERS_UP, get_features
+from common.runtime import GestureApp, Runtime
 
 mp_hands = mp.solutions.hands
 
 
-landmarker = EasyHandLandmarker()
-
-# Initialize OpenCV
-cap = cv2.VideoCapture(2)  # Use 0 for the default camera
-
-while cap.isOpened():
-    ret, frame = cap.read()
-    if not ret:
-        break
+class BinaryApp(GestureApp):
+    def __init__(self):
+        self.total = 0
 
-    frame = cv2.flip(frame, 1)
-
-    # Process the frame with MediaPipe Hands
-    landmarker.process_frame(frame)
-    results = landmarker.get_latest_result()
-
-    if results:
-        draw_landmarks(frame, results)
-        total = 0
-        for hand, landmarks in enumerate(results.hand_landmarks):
-            for i, is_up in enumerate(fingers_are_up(landmarks)):
-                total <<= 1
-                if is_up:
-                    total += 1
+    def update(self, frame, points):
+        self.total = 0
+        # hands come in track order, so the first hand up keeps the high bits
+        # however MediaPipe orders them
+        for is_up in get_features(points)[FINGERS_UP].flat:
+            self.total <<= 1
+            if is_up:
+                self.total += 1
 
+    def render(self, frame):
         cv2.putText(
             frame,
-            f"{bin(total)} = {total}",
+            f"{bin(self.total)} = {self.total}",
             (10, 50),
             cv2.FONT_HERSHEY_DUPLEX,
             1,
@@ -50,14 +38,10 @@ while cap.isOpened():
             2,
         )
 
-    # Display the resulting frame
-    cv2.imshow("handiwork", frame)
 
-    # Break the loop if 'q' is pressed
-    if cv2.waitKey(1) & 0xFF == ord("q"):
-        break
+def create_app():
+    return BinaryApp()
+
 
-# Release the VideoCapture and close all windows
-cap.release()
-cv2.destroyAllWindows()
-landmarker.close()
+if __name__ == "__main__":
+    Runtime([create_app()]).run()
@@ -0,0 +1,230 @@
+"""
+Offline landmark extraction over recorded videos and image folders.
+
+    python -m common.batch recordings/*.mp4 stills/ -o landmarks/ --workers 4
+
+Video files are run in VIDEO mode and directories of images in IMAGE mode,
+each as one landmark stream, written as a recording (see common/recording.py)
+to OUTPUT_DIR/<name>-<hash>.hwlm, where the hash is of the input's full path so
+inputs with the same name in different folders don't overwrite each other.
+Inputs are spread over a pool of processes. Each video gets a landmarker of its
+own, since VIDEO mode carries hands over from one frame to the next, while
+image folders share one per worker. Streams that already have an output file
+are skipped, so an interrupted run can just be started again.
+
+Frames are mirrored before inference (like the live demos do) unless
+`--no-flip` is given, so the landmarks line up with what the demos expect.
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any
+
+import cv2
+import mediapipe as mp
+
+from common.calibration import DELEGATES
+from common.hands import (
+    BaseOptions,
+    HandLandmarker,
+    HandLandmarkerOptions,
+    VisionRunningMode,
+)
+from common.recording import LandmarkRecorder
+
+IMAGE_EXTENSIONS = {".bmp", ".jpeg", ".jpg", ".png", ".webp"}
+
+# per-worker state, set up by _init_worker
+_worker: dict[str, Any] = {}
+
+
+def _init_worker(model_path, delegate, num_hands, flip):
+    # keep each worker to one OpenCV thread; the pool provides the parallelism
+    cv2.setNumThreads(1)
+    _worker.update(
+        model_path=model_path,
+        delegate=delegate,
+        num_hands=num_hands,
+        flip=flip,
+        landmarkers={},
+        rgb_buffer=None,
+    )
+
+
+def _create_landmarker(running_mode):
+    return HandLandmarker.create_from_options(
+        HandLandmarkerOptions(
+            base_options=BaseOptions(
+                model_asset_path=_worker["model_path"],
+                delegate=DELEGATES[_worker["delegate"]],
+            ),
+            running_mode=running_mode,
+            num_hands=_worker["num_hands"],
+        )
+    )
+
+
+def _get_landmarker(running_mode):
+    # shared by every input this worker runs in `running_mode`
+    landmarkers = _worker["landmarkers"]
+    if running_mode not in landmarkers:
+        landmarkers[running_mode] = _create_landmarker(running_mode)
+    return landmarkers[running_mode]
+
+
+def _to_mp_image(frame):
+    # convert into a reused buffer and flip that in place; mp.Image copies it
+    rgb = _worker["rgb_buffer"] = cv2.cvtColor(
+        frame, cv2.COLOR_BGR2RGB, _worker["rgb_buffer"]
+    )
+    if _worker["flip"]:
+        cv2.flip(rgb, 1, rgb)
+    return mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb)
+
+
+def _video_frames(path):
+    cap = cv2.VideoCapture(str(path))
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30
+    frame = None
+    try:
+        index = 0
+        while True:
+            # decode into the same buffer each time; frames are used one by one
+            ret, frame = cap.read(frame)
+            if not ret:
+                break
+            # some containers don't report positions, so fall back to the index
+            timestamp_ms = int(cap.get(cv2.CAP_PROP_POS_MSEC)) or int(
+                index * 1000 / fps
+            )
+            yield timestamp_ms, frame
+            index += 1
+    finally:
+        cap.release()
+
+
+def _image_frames(path):
+    images = sorted(p for p in path.iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+    for index, image_path in enumerate(images):
+        frame = cv2.imread(str(image_path))
+        if frame is not None:
+            yield index, frame
+
+
+def extract(path, recorder):
+    """Runs a landmarker over one input, writing each frame's landmarks to
+    `recorder`. Returns the number of frames."""
+    path = Path(path)
+    frames = 0
+
+    if path.is_dir():
+        landmarker = _get_landmarker(VisionRunningMode.IMAGE)
+        for index, frame in _image_frames(path):
+            result = landmarker.detect(_to_mp_image(frame))
+            recorder.add_result(index, result, frame.shape[1::-1])
+            frames += 1
+    else:
+        # a fresh landmarker, so no hands are carried over from the last file
+        # and the output doesn't depend on which worker ran what before it
+        with _create_landmarker(VisionRunningMode.VIDEO) as landmarker:
+            last_timestamp_ms = -1
+            for timestamp_ms, frame in _video_frames(path):
+                # mediapipe wants timestamps that keep increasing
+                timestamp_ms = max(timestamp_ms, last_timestamp_ms + 1)
+                last_timestamp_ms = timestamp_ms
+                result = landmarker.detect_for_video(_to_mp_image(frame), timestamp_ms)
+                recorder.add_result(timestamp_ms, result, frame.shape[1::-1])
+                frames += 1
+
+    return frames
+
+
+def process(path, output_path):
+    start = time.perf_counter()
+    # record to a temporary file first so a killed run never leaves a partial
+    # output behind that would be skipped on resume
+    tmp_path = output_path.with_name(output_path.name + ".tmp")
+    try:
+        with LandmarkRecorder(tmp_path) as recorder:
+            frames = extract(path, recorder)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    os.replace(tmp_path, output_path)
+    return frames, time.perf_counter() - start
+
+
+def output_path_for(path, output_dir):
+    """Returns where the recording of `path` goes, named after it and a hash
+    of its full path."""
+    path = Path(path).resolve()
+    digest = hashlib.sha1(os.fsencode(path)).hexdigest()[:8]
+    return Path(output_dir) / f"{path.stem}-{digest}.hwlm"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m common.batch", description=__doc__.split("\n\n")[0].strip()
+    )
+    parser.add_argument("inputs", nargs="+", type=Path, help="videos or image folders")
+    parser.add_argument("-o", "--output", type=Path, required=True)
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--model", default="hand_landmarker.task")
+    parser.add_argument("--delegate", choices=list(DELEGATES), default="cpu")
+    parser.add_argument("--num-hands", type=int, default=2)
+    parser.add_argument("--no-flip", dest="flip", action="store_false")
+    args = parser.parse_args(argv)
+
+    output_paths = [output_path_for(path, args.output) for path in args.inputs]
+    # the same input given twice (say, by a relative and an absolute path)
+    inputs = {}
+    for path, output_path in zip(args.inputs, output_paths):
+        if output_path in inputs:
+            parser.error(f"{inputs[output_path]} and {path} are the same input")
+        inputs[output_path] = path
+
+    args.output.mkdir(parents=True, exist_ok=True)
+    todo = []
+    for path, output_path in zip(args.inputs, output_paths):
+        if output_path.exists():
+            print(f"skipping {path} (already done)")
+        else:
+            todo.append((path, output_path))
+
+    start = time.perf_counter()
+    total_frames = 0
+    failed = 0
+    with ProcessPoolExecutor(
+        max_workers=args.workers,
+        initializer=_init_worker,
+        initargs=(args.model, args.delegate, args.num_hands, args.flip),
+    ) as pool:
+        futures = {
+            pool.submit(process, path, output_path): path for path, output_path in todo
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            path = futures[future]
+            try:
+                frames, seconds = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"[{done}/{len(todo)}] {path}: failed: {e}", file=sys.stderr)
+                continue
+            total_frames += frames
+            elapsed = time.perf_counter() - start
+            print(
+                f"[{done}/{len(todo)}] {path}: {frames} frames"
+                f" at {frames / seconds:.1f} fps"
+                f" (overall {total_frames / elapsed:.1f} fps)"
+            )
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
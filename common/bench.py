@@ -0,0 +1,342 @@
+"""
+Per-stage benchmarks of the demos, run headless against recorded input.
+
+    python -m common.bench --video fixtures/wave.mp4 --delegate cpu -o bench.json
+    python -m common.bench -d ball draw --replay fixtures/wave.hwlm --compare bench.json
+
+Every demo (or just the ones given with --demos) is run in its own process
+with the window and keyboard stubbed out, stopping after --frames frames (plus
+--warmup frames that aren't counted) or when the input runs out. Any flags the
+benchmark doesn't know about (--video, --replay, --delegate, --roi, ...) are
+passed on to the demos.
+
+The timings come from the spans in common/profiling.py, summed per stage and
+frame, and are reported as percentiles in milliseconds along with the frame
+rate and peak memory of each demo. "gesture" is the time spent in the demo's
+`update`, "render" covers both landmark drawing and the demo's `render`, and
+"frame" is whatever else the main loop does.
+
+Results are written as JSON. Passing an earlier result file with --compare
+prints the change in each stage and exits with status 1 if any stage's p50 or
+p90 got slower by more than --threshold.
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import runpy
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from common import profiling
+from common.display import press_key
+from common.metrics import get_monitor
+from common.sway import FakeSwayServer
+
+DEMOS = [
+    "actions",
+    "ball",
+    "binary",
+    "draw",
+    "gun",
+    "knob",
+    "music",
+    "rect",
+    "sao",
+    "scroll",
+    "slider",
+]
+ROOT = Path(__file__).resolve().parent.parent
+PERCENTILES = [50, 90, 99]
+# stages in the order a frame goes through them, for printing
+STAGE_ORDER = [
+    "capture",
+    "flip",
+    "capture_wait",
+    "convert",
+    "submit",
+    "inference",
+    "callback",
+    "predict",
+    "gesture",
+    "render",
+    "display",
+    "waitKey",
+    "action",
+    "frame",
+]
+
+
+class StageCollector:
+    """A profiling sink that sums the self time of each stage per frame."""
+
+    def __init__(self, frame_limit):
+        # (stage, thread, frame) -> seconds
+        self.totals = defaultdict(float)
+        self.frame_starts = {}
+        self.frame_limit = frame_limit
+
+    def __call__(self, span):
+        self.totals[span.name, span.thread, span.frame] += span.self_time
+        if span.name == "frame":
+            self.frame_starts[span.frame] = span.start
+            # a frame's span ends as the next one starts, so this quits after
+            # `frame_limit` frames, windowed or headless
+            if len(self.frame_starts) == self.frame_limit - 1:
+                press_key("q")
+
+    def summary(self, warmup):
+        samples = defaultdict(list)
+        for (stage, _thread, frame), seconds in self.totals.items():
+            if frame > warmup:
+                samples[stage].append(seconds * 1000)
+
+        stages = {}
+        for stage, values in samples.items():
+            values = np.array(values)
+            stages[stage] = {
+                **{
+                    f"p{p}": float(v)
+                    for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))
+                },
+                "max": float(values.max()),
+                "mean": float(values.mean()),
+                "count": len(values),
+            }
+        return stages
+
+
+def _stub_out_gui():
+    cv2.imshow = lambda _name, _frame: None
+    cv2.waitKey = lambda _delay=0: -1
+    cv2.destroyAllWindows = lambda: None
+
+
+def _stub_out_commands(demo_args, tmp):
+    # playerctl
+    def run(args, *_args, text=False, **_kwargs):
+        return subprocess.CompletedProcess(args, 0, "" if text else b"", "")
+
+    subprocess.run = run
+    os.environ["SWAYSOCK"] = str(Path(tmp) / "sway.sock")
+    FakeSwayServer(os.environ["SWAYSOCK"])
+    return [*demo_args, "--volume-backend", "fake"]
+
+
+def run_demo(name, frames, warmup, side_effects, demo_args, tmp):
+    """Runs one demo in this process and returns its results. `tmp` is a
+    directory for the stand-ins of external programs."""
+    collector = StageCollector(frames + warmup)
+    _stub_out_gui()
+    if not side_effects:
+        demo_args = _stub_out_commands(demo_args, tmp)
+
+    sys.argv = [str(ROOT / f"{name}.py"), *demo_args]
+    profiling.add_sink(collector)
+    error = None
+    start = time.perf_counter()
+    try:
+        runpy.run_path(sys.argv[0], run_name="__main__")
+    except SystemExit:
+        pass
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    end = time.perf_counter()
+    profiling.next_frame()
+    profiling.remove_sink(collector)
+
+    # the frame rate is measured from the first frame after the warm-up
+    timed_start = collector.frame_starts.get(warmup + 1, end)
+    timed_frames = max(0, len(collector.frame_starts) - warmup)
+    return {
+        "frames": len(collector.frame_starts),
+        "fps": timed_frames / (end - timed_start) if end > timed_start else 0.0,
+        "wall_time": end - start,
+        # kilobytes on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "error": error,
+        "startup": get_monitor().startup,
+        "stages": collector.summary(warmup),
+    }
+
+
+def _run_in_subprocess(name, args, demo_args):
+    with tempfile.TemporaryDirectory() as tmp:
+        result_path = Path(tmp) / "result.json"
+        command = [
+            sys.executable,
+            "-m",
+            "common.bench",
+            "--run",
+            name,
+            "--result-file",
+            str(result_path),
+            "--frames",
+            str(args.frames),
+            "--warmup",
+            str(args.warmup),
+        ]
+        if args.side_effects:
+            command.append("--side-effects")
+        completed = subprocess.run(
+            [*command, "--", *demo_args], stdout=subprocess.DEVNULL
+        )
+        if not result_path.exists():
+            return {"error": f"exited with status {completed.returncode}"}
+        return json.loads(result_path.read_text())
+
+
+def _stage_names(stages):
+    return sorted(
+        stages,
+        key=lambda s: (
+            STAGE_ORDER.index(s) if s in STAGE_ORDER else len(STAGE_ORDER),
+            s,
+        ),
+    )
+
+
+def print_results(results):
+    for name, result in results.items():
+        if "stages" not in result:
+            print(f"{name}: {result['error']}")
+            continue
+
+        print(
+            f"{name}: {result['frames']} frames, {result['fps']:.1f} fps,"
+            f" {result['peak_rss_mb']:.0f} MB peak"
+        )
+        if result["error"]:
+            print(f"  stopped early: {result['error']}")
+        if result["startup"]:
+            print(
+                f"  {'startup':<14} "
+                + ", ".join(f"{k} {v:.2f}s" for k, v in result["startup"].items())
+            )
+        for stage in _stage_names(result["stages"]):
+            stats = result["stages"][stage]
+            print(
+                f"  {stage:<14}"
+                + "".join(f" p{p} {stats[f'p{p}']:7.2f}" for p in PERCENTILES)
+                + f"  max {stats['max']:7.2f} ms"
+            )
+
+
+def compare(results, baseline, threshold):
+    """Prints how each stage changed from `baseline` and returns whether
+    anything got slower by more than `threshold` (a fraction)."""
+    regressed = False
+    for name, result in results.items():
+        old = baseline.get("demos", {}).get(name)
+        if not old or "stages" not in old or "stages" not in result:
+            continue
+
+        print(f"{name}: {old['fps']:.1f} -> {result['fps']:.1f} fps")
+        before = old.get("startup", {}).get("first_result")
+        after = result["startup"].get("first_result")
+        if before and after:
+            change = (after - before) / before
+            flag = ""
+            if change > threshold:
+                flag = " !"
+                regressed = True
+            print(
+                f"  first result   {before:.2f}s -> {after:.2f}s ({change:+.0%}){flag}"
+            )
+        for stage in _stage_names(result["stages"]):
+            if stage not in old["stages"]:
+                continue
+            changes = []
+            for key in ("p50", "p90"):
+                before, after = old["stages"][stage][key], result["stages"][stage][key]
+                change = (after - before) / before if before else 0.0
+                flag = ""
+                # ignore sub-0.1ms stages, whose percentiles are mostly noise
+                if change > threshold and after - before > 0.1:
+                    flag = " !"
+                    regressed = True
+                changes.append(
+                    f"{key} {before:.2f} -> {after:.2f} ({change:+.0%}){flag}"
+                )
+            print(f"  {stage:<14} " + ", ".join(changes))
+    return regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m common.bench",
+        description=__doc__.split("\n\n")[0].strip(),
+        epilog="other arguments are passed to the demos",
+    )
+    parser.add_argument("-d", "--demos", nargs="+", choices=DEMOS, default=DEMOS)
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--warmup", type=int, default=30, help="frames to leave out")
+    parser.add_argument("-o", "--output", type=Path)
+    parser.add_argument("--compare", type=Path, help="an earlier --output file")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    parser.add_argument(
+        "--side-effects",
+        action="store_true",
+        help="let demos actually switch workspaces, control media and set the volume",
+    )
+    # used internally to run a single demo in a child process
+    parser.add_argument("--run", choices=DEMOS, help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", type=Path, help=argparse.SUPPRESS)
+    args, demo_args = parser.parse_known_args(argv)
+    if "--" in demo_args:
+        demo_args.remove("--")
+
+    if args.run:
+        result = run_demo(
+            args.run,
+            args.frames,
+            args.warmup,
+            args.side_effects,
+            demo_args,
+            args.result_file.parent,
+        )
+        args.result_file.write_text(json.dumps(result))
+        # skip interpreter teardown, which can hang on mediapipe's threads
+        os._exit(0)
+
+    results = {}
+    for name in args.demos:
+        print(f"running {name}...", file=sys.stderr)
+        results[name] = _run_in_subprocess(name, args, demo_args)
+    print_results(results)
+
+    if args.output:
+        args.output.write_text(
+            json.dumps(
+                {
+                    "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                    "platform": platform.platform(),
+                    "python": platform.python_version(),
+                    "arguments": demo_args,
+                    "frames": args.frames,
+                    "warmup": args.warmup,
+                    "demos": results,
+                },
+                indent=2,
+            )
+        )
+
+    failed = any(result.get("error") for result in results.values())
+    if args.compare:
+        print()
+        if compare(results, json.loads(args.compare.read_text()), args.threshold):
+            return 1
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""
+Startup calibration for the hand landmarker.
+
+Times a few warm-up inferences on a synthetic frame under every delegate and
+thread count that works on this machine, and caches the fastest choice on disk
+keyed by hostname and model hash, so only the first launch pays for it.
+
+MediaPipe's Python `BaseOptions` doesn't expose the TFLite interpreter's thread
+count, so the thread setting tuned here is OpenCV's (`cv2.setNumThreads`), which
+covers the colour conversion and resizing done before each inference.
+"""
+
+import hashlib
+import json
+import os
+import socket
+import statistics
+import time
+from pathlib import Path
+
+import cv2
+import mediapipe as mp
+import numpy as np
+
+BaseOptions = mp.tasks.BaseOptions
+HandLandmarker = mp.tasks.vision.HandLandmarker
+HandLandmarkerOptions = mp.tasks.vision.HandLandmarkerOptions
+VisionRunningMode = mp.tasks.vision.RunningMode
+
+DELEGATES = {
+    "cpu": BaseOptions.Delegate.CPU,
+    "gpu": BaseOptions.Delegate.GPU,
+}
+
+WARMUP_RUNS = 3
+TIMED_RUNS = 10
+
+
+def cache_path():
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "handiwork" / "calibration.json"
+
+
+def cache_key(model_path):
+    digest = hashlib.sha256(Path(model_path).read_bytes()).hexdigest()
+    return f"{socket.gethostname()}:{digest}"
+
+
+def load_cache():
+    try:
+        return json.loads(cache_path().read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(cache):
+    path = cache_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(cache, indent=2))
+    tmp_path.replace(path)
+
+
+def time_configuration(model_path, delegate, num_threads, frame):
+    landmarker = HandLandmarker.create_from_options(
+        HandLandmarkerOptions(
+            base_options=BaseOptions(
+                model_asset_path=model_path, delegate=DELEGATES[delegate]
+            ),
+            running_mode=VisionRunningMode.IMAGE,
+        )
+    )
+    previous_threads = cv2.getNumThreads()
+    cv2.setNumThreads(num_threads)
+    try:
+        timings = []
+        for run in range(WARMUP_RUNS + TIMED_RUNS):
+            start = time.perf_counter()
+            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            landmarker.detect(mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb))
+            if run >= WARMUP_RUNS:
+                timings.append(time.perf_counter() - start)
+        return statistics.median(timings)
+    finally:
+        cv2.setNumThreads(previous_threads)
+        landmarker.close()
+
+
+def calibrate(model_path, frame_size=(640, 480), thread_counts=None):
+    width, height = frame_size
+    frame = np.random.default_rng(0).integers(
+        0, 256, (height, width, 3), dtype=np.uint8
+    )
+    if thread_counts is None:
+        thread_counts = sorted({1, 2, os.cpu_count() or 1})
+
+    best = None
+    for delegate in DELEGATES:
+        for num_threads in thread_counts:
+            try:
+                seconds = time_configuration(model_path, delegate, num_threads, frame)
+            except RuntimeError as e:
+                # e.g. no GPU service on this machine
+                print(f"calibration: skipping {delegate}: {e}")
+                break
+            print(
+                f"calibration: {delegate} with {num_threads} threads:"
+                f" {seconds * 1000:.1f}ms"
+            )
+            if best is None or seconds < best["inference_ms"] / 1000:
+                best = {
+                    "delegate": delegate,
+                    "num_threads": num_threads,
+                    "inference_ms": seconds * 1000,
+                }
+
+    if best is None:
+        raise RuntimeError(f"no delegate could run {model_path}")
+    return best
+
+
+def get_calibration(model_path, recalibrate=False):
+    """Returns the cached calibration for this host and model, calibrating first
+    if there isn't one (or if `recalibrate` is set)."""
+    key = cache_key(model_path)
+    cache = load_cache()
+    if recalibrate or key not in cache:
+        cache[key] = calibrate(model_path)
+        save_cache(cache)
+    return cache[key]
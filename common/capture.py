@@ -0,0 +1,174 @@
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+from common import profiling
+from common.metrics import get_monitor
+from common.options import get_options
+from common.tracing import get_tracer
+
+
+class ThreadedCapture:
+    """Drop-in replacement for `cv2.VideoCapture` that reads on its own thread.
+
+    Frames are read (and mirrored, like every demo wants) on a background
+    thread into a small ring buffer. When the consumer falls behind, the oldest
+    buffered frame is dropped, so `read` always hands back something recent and
+    a slow camera read never stalls inference or rendering.
+
+    Frame buffers are recycled rather than allocated per frame, so a frame
+    returned by `read` is only valid until the next call to `read`.
+    """
+
+    def __init__(self, source=2, buffer_size=2, flip=True, drop_oldest=True):
+        self.cap = cv2.VideoCapture(source)
+        self.flip = flip
+        self.drop_oldest = drop_oldest
+        self.frames = deque(maxlen=buffer_size)
+        # buffered frames, plus the one being read into and the one handed out
+        self.pool_size = buffer_size + 2
+        self.free_buffers = []
+        self.frame_in_use = None
+        # what the camera decodes into before flipping into a pooled buffer
+        self.read_buffer = None
+        self.condition = threading.Condition()
+        self.dropped_frames = 0
+        self.frame_time = None
+        self.running = self.cap.isOpened()
+        self.thread = threading.Thread(target=self._run, name="capture", daemon=True)
+        self.thread.start()
+
+    def _take_buffer(self):
+        # None until the pool fills up; OpenCV allocates in its place
+        with self.condition:
+            return self.free_buffers.pop() if self.free_buffers else None
+
+    def _recycle(self, buffer):
+        # called with the condition held
+        if buffer is not None and len(self.free_buffers) < self.pool_size:
+            self.free_buffers.append(buffer)
+
+    def _run(self):
+        while self.running:
+            if self.flip:
+                with profiling.span("capture"):
+                    ret, self.read_buffer = self.cap.read(self.read_buffer)
+                if not ret:
+                    break
+                frame_time = time.monotonic()
+                with profiling.span("flip"):
+                    frame = cv2.flip(self.read_buffer, 1, self._take_buffer())
+            else:
+                with profiling.span("capture"):
+                    ret, frame = self.cap.read(self._take_buffer())
+                if not ret:
+                    break
+                frame_time = time.monotonic()
+
+            with self.condition:
+                if len(self.frames) == self.frames.maxlen:
+                    if self.drop_oldest:
+                        self.dropped_frames += 1
+                        self._recycle(self.frames.popleft()[0])
+                    else:
+                        # files have no "latest" frame, so wait for room instead
+                        self.condition.wait_for(
+                            lambda: len(self.frames) < self.frames.maxlen
+                            or not self.running
+                        )
+                self.frames.append((frame, frame_time))
+                self.condition.notify_all()
+
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+
+    def isOpened(self):
+        return self.running or bool(self.frames)
+
+    def read(self, timeout=None):
+        profiling.next_frame()
+        with self.condition, profiling.span("capture_wait"):
+            # the caller is done with the previous frame
+            self._recycle(self.frame_in_use)
+            self.frame_in_use = None
+            self.condition.wait_for(
+                lambda: self.frames or not self.running, timeout=timeout
+            )
+            if not self.frames:
+                return False, None
+            self.frame_in_use, self.frame_time = self.frames.popleft()
+            self.condition.notify_all()
+            return True, self.frame_in_use
+
+    def release(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        self.thread.join()
+        self.cap.release()
+
+
+class BlankCapture:
+    """Produces a fixed number of black frames, for replaying recorded landmarks
+    without a camera. `interval` paces the frames, in seconds.
+
+    Like `ThreadedCapture`, it reuses one buffer, cleared on every `read`.
+    """
+
+    def __init__(self, width, height, count, interval=0):
+        self.frame = np.zeros((height, width, 3), dtype=np.uint8)
+        self.remaining = count
+        self.interval = interval
+        self.frame_time = None
+        self.dropped_frames = 0
+
+    def isOpened(self):
+        return self.remaining > 0
+
+    def read(self, timeout=None):
+        profiling.next_frame()
+        if self.remaining <= 0:
+            return False, None
+        if self.interval and self.frame_time is not None:
+            with profiling.span("capture_wait"):
+                time.sleep(max(0, self.frame_time + self.interval - time.monotonic()))
+        self.remaining -= 1
+        self.frame_time = time.monotonic()
+        self.frame.fill(0)
+        return True, self.frame
+
+    def release(self):
+        self.remaining = 0
+
+
+def open_capture():
+    """Opens the frame source chosen on the command line: a video file with
+    --video, blank frames when replaying a recording with --replay, and the
+    camera from --camera otherwise."""
+    options = get_options()
+    # every script opens its capture first, so this is where tracing starts
+    get_tracer()
+    if options.video:
+        cap = ThreadedCapture(options.video, drop_oldest=False)
+    elif options.replay:
+        # imported here to keep plain camera capture free of mediapipe
+        from common.recording import LandmarkRecording
+
+        recording = LandmarkRecording(options.replay)
+        width, height = recording.frame_size
+        count = len(recording)
+        interval = 0
+        if options.realtime and count > 1:
+            timestamps = recording.timestamps
+            interval = (timestamps[-1] - timestamps[0]) / (count - 1) / 1000
+        recording.close()
+        cap = BlankCapture(width or 640, height or 480, count, interval)
+    else:
+        cap = ThreadedCapture(options.camera)
+
+    get_monitor().capture = cap
+    return cap
@@ -0,0 +1,156 @@
+"""
+Side effects (window manager commands, media keys...) run off the frame loop.
+
+    dispatcher = get_dispatcher()
+    dispatcher.submit("next", ["playerctl", "next"])
+
+returns straight away, and the command runs on a worker thread. Actions are
+submitted under a key: while one is waiting to start, a newer one with the
+same key replaces it, so a gesture firing every frame can't queue up work
+faster than it gets done, and actions with the same key never run at the same
+time or out of order. With `debounce`, an action waits until its key has gone
+quiet for that long before starting.
+
+Done and error callbacks are queued and run by `poll`, which the runtime
+calls at the start of every frame, so they run on the main thread and can
+touch app state freely.
+"""
+
+import functools
+import queue
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, NamedTuple
+
+from common import profiling
+
+
+class _Action(NamedTuple):
+    # a command (list of arguments) or a function
+    run: Any
+    due: float
+    timeout: float
+    on_done: Callable | None
+    on_error: Callable | None
+
+
+class ActionDispatcher:
+    """Runs actions on a pool of `workers` threads. Commands that take longer
+    than `timeout` seconds are killed."""
+
+    def __init__(self, workers=2, timeout=5.0):
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="action")
+        self.condition = threading.Condition()
+        # key -> _Action waiting to start
+        self.pending = {}
+        self.running = set()
+        self.completed = queue.SimpleQueue()
+        self.flushing = False
+        self.coalesced = 0
+        self.thread = None
+
+    def submit(
+        self, key, action, debounce=0.0, timeout=None, on_done=None, on_error=None
+    ):
+        """Queues a command (a list of arguments for `subprocess.run`) or a
+        function to run. `on_done` gets the function's return value or the
+        `CompletedProcess`, `on_error` the exception; a command exiting with a
+        non-zero status counts as an error. Errors without an `on_error` are
+        printed."""
+        with self.condition:
+            if self.thread is None:
+                self.thread = threading.Thread(
+                    target=self._schedule, name="dispatch", daemon=True
+                )
+                self.thread.start()
+            if key in self.pending:
+                self.coalesced += 1
+            self.pending[key] = _Action(
+                action,
+                time.monotonic() + debounce,
+                self.timeout if timeout is None else timeout,
+                on_done,
+                on_error,
+            )
+            self.condition.notify_all()
+
+    def _schedule(self):
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                next_due = None
+                for key, action in list(self.pending.items()):
+                    if key in self.running:
+                        continue
+                    if action.due <= now or self.flushing:
+                        del self.pending[key]
+                        self.running.add(key)
+                        self.executor.submit(self._run, key, action)
+                    elif next_due is None or action.due < next_due:
+                        next_due = action.due
+                self.condition.wait(None if next_due is None else next_due - now)
+
+    def _run(self, key, action):
+        try:
+            with profiling.span("action", key=key):
+                if callable(action.run):
+                    result = action.run()
+                else:
+                    result = subprocess.run(
+                        action.run,
+                        timeout=action.timeout,
+                        check=True,
+                        capture_output=True,
+                        text=True,
+                    )
+        except Exception as e:
+            self.completed.put((key, action.on_error, e))
+        else:
+            if action.on_done is not None:
+                self.completed.put((key, action.on_done, result))
+        finally:
+            with self.condition:
+                self.running.discard(key)
+                self.condition.notify_all()
+
+    def poll(self):
+        """Runs the callbacks of every action that finished since the last
+        call."""
+        while True:
+            try:
+                key, callback, value = self.completed.get_nowait()
+            except queue.Empty:
+                return
+            if callback is not None:
+                callback(value)
+            elif isinstance(value, Exception):
+                print(f"{key} failed: {_describe(value)}", file=sys.stderr)
+
+    def flush(self, timeout=None):
+        """Starts everything that's waiting, debounced or not, and waits for
+        it all to finish. Returns whether it did within `timeout` seconds."""
+        with self.condition:
+            self.flushing = True
+            self.condition.notify_all()
+            done = self.condition.wait_for(
+                lambda: not self.pending and not self.running, timeout
+            )
+            self.flushing = False
+        self.poll()
+        return done
+
+
+def _describe(error):
+    if isinstance(error, subprocess.CalledProcessError) and error.stderr:
+        return f"{error} ({error.stderr.strip()})"
+    return str(error) or type(error).__name__
+
+
+@functools.cache
+def get_dispatcher():
+    """Returns the process's `ActionDispatcher`."""
+    return ActionDispatcher()
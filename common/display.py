@@ -0,0 +1,92 @@
+"""
+The demo window, and key presses from outside it.
+
+`show` draws a frame and returns the key pressed. Keys can also be pressed
+with `press_key`, from another thread or a signal handler. Headless runs (see
+--headless) have no window, so `start_headless_input` turns stdin lines and
+signals into key presses, which `poll_key` returns.
+"""
+
+import queue
+import signal
+import sys
+import threading
+
+import cv2
+
+from common import profiling
+from common.metrics import TOGGLE_KEY, get_monitor
+
+WINDOW_NAME = "handiwork"
+# what `cv2.waitKey(1) & 0xFF` returns when nothing was pressed
+NO_KEY = 0xFF
+# headless stand-ins for keys: quit, reset, and (in the launcher) next demo
+SIGNAL_KEYS = {
+    signal.SIGINT: "q",
+    signal.SIGTERM: "q",
+    signal.SIGUSR1: "r",
+    signal.SIGUSR2: "\t",
+}
+
+# key codes, from press_key
+_pressed: queue.SimpleQueue[int] = queue.SimpleQueue()
+
+
+def press_key(key):
+    """Queues a key press (a character or key code), as if it was typed into
+    the window."""
+    _pressed.put(ord(key) if isinstance(key, str) else key)
+
+
+def poll_key():
+    """Returns the next key queued with `press_key`, or `NO_KEY`."""
+    try:
+        return _pressed.get_nowait()
+    except queue.Empty:
+        return NO_KEY
+
+
+def _read_stdin():
+    for line in sys.stdin:
+        line = line.strip("\n")
+        if line:
+            press_key(line[0])
+
+
+def start_headless_input():
+    """Presses the first character of each line typed on stdin, and the keys in
+    `SIGNAL_KEYS` when those signals arrive."""
+    for signum, key in SIGNAL_KEYS.items():
+        signal.signal(signum, lambda _signum, _frame, key=key: press_key(key))
+    if sys.stdin is not None:
+        threading.Thread(target=_read_stdin, name="stdin", daemon=True).start()
+
+
+def show(frame: cv2.typing.MatLike):
+    """Shows a frame in the window and returns the key pressed, if any, as
+    `cv2.waitKey(1) & 0xFF`.
+
+    This is also where the performance overlay is drawn and toggled, see
+    common/metrics.py.
+    """
+    monitor = get_monitor()
+    if monitor.started and monitor.landmarker is not None:
+        monitor.observe_result(monitor.landmarker.peek_result())
+    if monitor.hud_visible:
+        monitor.draw(frame)
+
+    with profiling.span("display"):
+        cv2.imshow(WINDOW_NAME, frame)
+        with profiling.span("waitKey"):
+            key = cv2.waitKey(1) & 0xFF
+    if key == NO_KEY:
+        key = poll_key()
+
+    if key == TOGGLE_KEY:
+        monitor.hud_visible = not monitor.hud_visible
+        monitor.start()
+    return key
+
+
+def close_window():
+    cv2.destroyAllWindows()
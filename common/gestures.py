@@ -0,0 +1,236 @@
+"""
+Gestures as rules over shared, lazily computed hand features.
+
+A `Feature` is a per-hand value: a landmark coordinate, the angle of the line
+between two landmarks, a squared distance, or anything built from those with
+arithmetic, comparisons and `&`, `|` and `~`. Gestures are just boolean
+features, e.g.
+
+    THUMBS_UP = finger_up(THUMB) & ~finger_up(INDEX) & (
+        landmark(HandLandmark.THUMB_TIP, Y) < landmark(HandLandmark.WRIST, Y)
+    )
+
+`get_features(points)` returns the `HandFeatures` of a frame's landmarks, and
+indexing it with a feature computes that feature for every hand at once, the
+first time it's asked for. Features are identified by what they compute, so
+two gestures (or two apps) built on the same angle share one computation, and
+the cost of a frame depends on how many distinct features are used rather
+than on how many gestures there are.
+"""
+
+import math
+import operator
+
+import numpy as np
+
+from common.hands import (
+    FINGER_JOINTS,
+    HandLandmark,
+    atan2_array,
+    pinch_pointers,
+)
+
+X, Y, Z = range(3)
+THUMB, INDEX, MIDDLE, RING, PINKY = range(5)
+# `HandFeatures` kept around, so apps sharing a frame's landmarks share them
+MAX_CACHED = 4
+
+
+class Feature:
+    """A per-hand value, computed from a `HandFeatures` by `compute`. `key`
+    identifies what it computes."""
+
+    def __init__(self, key, compute):
+        self.key = key
+        self.compute = compute
+
+    def __repr__(self):
+        return f"Feature{self.key}"
+
+    def _apply(self, function, other=None):
+        if other is None:
+            return Feature(
+                (function.__name__, self.key),
+                lambda features: function(features[self]),
+            )
+        other = _lift(other)
+        return Feature(
+            (function.__name__, self.key, other.key),
+            lambda features: function(features[self], features[other]),
+        )
+
+    def __lt__(self, other):
+        return self._apply(operator.lt, other)
+
+    def __le__(self, other):
+        return self._apply(operator.le, other)
+
+    def __gt__(self, other):
+        return self._apply(operator.gt, other)
+
+    def __ge__(self, other):
+        return self._apply(operator.ge, other)
+
+    def __add__(self, other):
+        return self._apply(operator.add, other)
+
+    def __sub__(self, other):
+        return self._apply(operator.sub, other)
+
+    def __rsub__(self, other):
+        return _lift(other)._apply(operator.sub, self)
+
+    def __mul__(self, other):
+        return self._apply(operator.mul, other)
+
+    __radd__ = __add__
+    __rmul__ = __mul__
+
+    def __and__(self, other):
+        return self._apply(operator.and_, other)
+
+    def __or__(self, other):
+        return self._apply(operator.or_, other)
+
+    def __invert__(self):
+        return self._apply(operator.invert)
+
+    def __abs__(self):
+        return self._apply(np.abs)
+
+
+def _lift(value):
+    if isinstance(value, Feature):
+        return value
+    return Feature(("constant", value), lambda _features: value)
+
+
+def landmark(index, axis):
+    """A normalized coordinate (X, Y or Z) of one landmark."""
+    return Feature(
+        ("landmark", int(index), axis),
+        lambda features: features.points[:, index, axis],
+    )
+
+
+class _PairTable:
+    """Landmark pairs used by any `angle` (or `distance_squared`) feature,
+    which are all computed together, in one go, the first time a frame needs
+    any of them."""
+
+    def __init__(self, name, compute):
+        self.name = name
+        self.compute = compute
+        self.columns = {}
+        self.starts = []
+        self.ends = []
+        self.all = None
+
+    def _compute_all(self, features):
+        return self.compute(features.points, self.starts, self.ends)
+
+    def feature(self, start, end):
+        pair = int(start), int(end)
+        column = self.columns.get(pair)
+        if column is None:
+            column = self.columns[pair] = len(self.starts)
+            self.starts.append(pair[0])
+            self.ends.append(pair[1])
+            # a table with more columns is a different feature
+            self.all = Feature((self.name, len(self.starts)), self._compute_all)
+        return Feature(
+            (self.name, *pair),
+            lambda features: features[self.all][:, column],
+        )
+
+
+def _distances_squared(points, starts, ends):
+    return np.sum((points[:, ends, :2] - points[:, starts, :2]) ** 2, axis=-1)
+
+
+_angles = _PairTable("angle", atan2_array)
+_distances = _PairTable("distance_squared", _distances_squared)
+
+
+def angle(start, end):
+    """The direction from one landmark to another, in radians."""
+    return _angles.feature(start, end)
+
+
+def distance_squared(a, b):
+    return _distances.feature(a, b)
+
+
+def finger_up(finger):
+    """Whether a finger (THUMB to PINKY) is straight, with its base and tip
+    bones pointing the same way."""
+    joints = FINGER_JOINTS[finger]
+    return abs(angle(joints[0], joints[1]) - angle(joints[2], joints[3])) < math.pi / 4
+
+
+def all_of(*features):
+    result = features[0]
+    for feature in features[1:]:
+        result = result & feature
+    return result
+
+
+THUMB_TO_INDEX = distance_squared(HandLandmark.THUMB_TIP, HandLandmark.INDEX_FINGER_TIP)
+# the thumb and index tips close together, relative to how far each is from
+# the wrist (multiplied out, to avoid dividing by zero)
+PINCH = (
+    THUMB_TO_INDEX
+    <= 0.08 * distance_squared(HandLandmark.THUMB_TIP, HandLandmark.WRIST)
+) & (
+    THUMB_TO_INDEX
+    <= 0.2 * distance_squared(HandLandmark.INDEX_FINGER_TIP, HandLandmark.WRIST)
+)
+# (hands, 2) point between the thumb and index tips
+PINCH_POINTER = Feature(
+    ("pinch_pointer",), lambda features: pinch_pointers(features.points)
+)
+_FINGER_UP = [finger_up(finger) for finger in range(5)]
+# (hands, 5), thumb first
+FINGERS_UP = Feature(
+    ("fingers_up",),
+    lambda features: np.stack(
+        [features[finger_up] for finger_up in _FINGER_UP], axis=-1
+    ),
+)
+
+
+class HandFeatures:
+    """The features of one frame's (hands, 21, 3) landmarks, each computed
+    for every hand the first time it's indexed."""
+
+    def __init__(self, points):
+        self.points = points
+        self.values = {}
+
+    def __getitem__(self, feature):
+        value = self.values.get(feature.key)
+        if value is None:
+            value = self.values[feature.key] = feature.compute(self)
+        return value
+
+    def __len__(self):
+        return len(self.points)
+
+
+# id(points) -> (points, HandFeatures), holding on to the points so the id
+# can't be reused while cached
+_cache: dict[int, tuple[np.ndarray, HandFeatures]] = {}
+
+
+def get_features(points):
+    """Returns the `HandFeatures` of `points`, shared by everyone passing the
+    same array."""
+    entry = _cache.get(id(points))
+    if entry is not None and entry[0] is points:
+        return entry[1]
+
+    features = HandFeatures(points)
+    _cache[id(points)] = points, features
+    if len(_cache) > MAX_CACHED:
+        del _cache[next(iter(_cache))]
+    return features
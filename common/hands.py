@@ -1,8 +1,19 @@
+import dataclasses
+import functools
 import math
+import threading
+import time
+from collections.abc import Mapping
+from typing import NamedTuple
 
 import cv2
 import mediapipe as mp
-from mediapipe.framework.formats import landmark_pb2
+import numpy as np
+
+from common import profiling
+from common.calibration import DELEGATES, get_calibration
+from common.metrics import get_monitor
+from common.options import get_options
 
 mp_drawing = mp.solutions.drawing_utils
 mp_hands = mp.solutions.hands
@@ -14,57 +25,555 @@ HandLandmarkerResult = mp.tasks.vision.HandLandmarkerResult
 VisionRunningMode = mp.tasks.vision.RunningMode
 
 
+@dataclasses.dataclass
+class FrameResult:
+    """A landmarker result tagged with the frame it was computed from.
+
+    Times are `time.monotonic()` seconds. The landmark attributes of the
+    underlying `HandLandmarkerResult` are passed through, so a `FrameResult`
+    can be used anywhere a plain result was.
+    """
+
+    result: HandLandmarkerResult
+    sequence: int
+    capture_time: float
+    submit_time: float
+    result_time: float
+
+    @property
+    def hand_landmarks(self):
+        return self.result.hand_landmarks
+
+    @property
+    def hand_world_landmarks(self):
+        return self.result.hand_world_landmarks
+
+    @property
+    def handedness(self):
+        return self.result.handedness
+
+    @functools.cached_property
+    def points(self):
+        return landmarks_to_array(self.result)
+
+    @property
+    def inference_time(self):
+        return self.result_time - self.submit_time
+
+    def age(self, now=None):
+        return (time.monotonic() if now is None else now) - self.capture_time
+
+
+class Submission(NamedTuple):
+    sequence: int
+    capture_time: float
+    submit_time: float
+    # (x0, y0, x1, y1) pixel crop that was sent to the model, or None
+    region: tuple[int, int, int, int] | None
+    frame_size: tuple[int, int]
+    # main-loop iteration it was submitted in, see common/profiling.py
+    frame: int
+
+
+class LandmarkPredictor:
+    """Extrapolates landmarks between inference results.
+
+    Every landmark of every hand gets a velocity, smoothed with a One Euro
+    style filter: heavily while a hand is still, to hide the model's jitter,
+    and hardly at all while it moves fast, so it doesn't lag behind. `predict`
+    moves the latest landmarks along their velocities to the requested time,
+    at most `max_lead` seconds past the result they came from.
+
+    Hands are matched between results by their nearest wrist. A hand that
+    can't be matched starts out still.
+    """
+
+    def __init__(self, min_cutoff=1.0, beta=0.5, max_lead=0.15, max_jump=0.2):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.max_lead = max_lead
+        # how far (normalized) a wrist can move between results and still be
+        # taken for the same hand
+        self.max_jump = max_jump
+        self.sequence = -1
+        self.points = None
+        self.velocity = None
+        self.time = None
+
+    def update(self, points, capture_time, sequence=None):
+        """Takes a new (hands, 21, 3) result, captured at `capture_time`."""
+        if sequence is not None:
+            if sequence == self.sequence:
+                return
+            self.sequence = sequence
+
+        velocity = np.zeros_like(points)
+        if self.points is not None and len(points) and len(self.points):
+            dt = capture_time - self.time
+            wrists = points[:, HandLandmark.WRIST, :2]
+            previous_wrists = self.points[:, HandLandmark.WRIST, :2]
+            distances = np.linalg.norm(wrists[:, None] - previous_wrists[None], axis=-1)
+            matches = distances.argmin(axis=1)
+            matched = (distances.min(axis=1) < self.max_jump) & (dt > 0)
+            # two hands can't both be the same hand from before
+            _, counts = np.unique(matches, return_counts=True)
+            if matched.any() and counts.max() == 1:
+                previous = matches[matched]
+                raw = (points[matched] - self.points[previous]) / dt
+                smoothed = self.velocity[previous]
+                speed = np.linalg.norm(smoothed[..., :2], axis=-1, keepdims=True)
+                cutoff = self.min_cutoff + self.beta * speed
+                alpha = 1 / (1 + 1 / (2 * math.pi * cutoff * dt))
+                velocity[matched] = smoothed + alpha * (raw - smoothed)
+
+        self.points = points
+        self.velocity = velocity
+        self.time = capture_time
+
+    def predict(self, now):
+        """Returns the landmarks extrapolated to `now`."""
+        if self.points is None:
+            return None
+        lead = min(max(now - self.time, 0.0), self.max_lead)
+        return self.points + self.velocity * lead
+
+    def reset(self):
+        self.sequence = -1
+        self.points = self.velocity = self.time = None
+
+
 class EasyHandLandmarker:
-    def __init__(self, **kwargs):
-        self.tracking_result = None
-        self.landmarker = HandLandmarker.create_from_options(
-            HandLandmarkerOptions(
-                base_options=BaseOptions(
-                    model_asset_path="hand_landmarker.task",
-                    delegate=BaseOptions.Delegate.GPU,
-                ),
-                running_mode=VisionRunningMode.LIVE_STREAM,
-                result_callback=self._process_result,
-                **kwargs,
+    """Live-stream hand landmarker with bounded in-flight inference.
+
+    With `roi` set, frames are cropped to a padded box around the hands found
+    in the previous result, and the full frame is only submitted every
+    `full_frame_interval` frames (or when no hands are being tracked) to pick
+    up new hands. A live-stream landmarker carries the hands it found over to
+    the next image, in that image's coordinates, so the full frames go to a
+    landmarker of their own, and the crops keep the same size until the hands
+    no longer fit (or fill less than half of it). `scale` downscales whatever
+    is submitted. Either way the landmarks in the results are normalized to
+    the full frame.
+
+    `inference_rate` caps how many frames a second are submitted. Frames in
+    between are skipped rather than counted as dropped, and with a
+    `predictor` (a `LandmarkPredictor`), `get_latest_result` fills them in by
+    extrapolating the latest landmarks to each frame's capture time. Only the
+    `points` of a predicted result are extrapolated; its `hand_landmarks` are
+    those of the inference it came from.
+    """
+
+    def __init__(
+        self,
+        model_path="hand_landmarker.task",
+        delegate="gpu",
+        num_threads=None,
+        recalibrate=False,
+        max_in_flight=1,
+        in_flight_timeout=1.0,
+        roi=False,
+        roi_padding=0.3,
+        min_roi_size=0.25,
+        full_frame_interval=15,
+        scale=1.0,
+        recorder=None,
+        inference_rate=None,
+        predictor=None,
+        **kwargs,
+    ):
+        if delegate == "auto":
+            calibration = get_calibration(model_path, recalibrate)
+            delegate = calibration["delegate"]
+            num_threads = calibration["num_threads"]
+        if num_threads is not None:
+            cv2.setNumThreads(num_threads)
+
+        self.max_in_flight = max_in_flight
+        self.in_flight_timeout = in_flight_timeout
+        self.sequence = 0
+        self.dropped_frames = 0
+        self.last_timestamp_ms = -1
+        self.roi = roi
+        self.roi_padding = roi_padding
+        self.min_roi_size = min_roi_size
+        self.full_frame_interval = full_frame_interval
+        self.frames_since_full_frame = 0
+        # normalized (x0, y0, x1, y1) around the last hands seen, or None
+        self.hands_box = None
+        # side of the crops, in pixels
+        self.roi_size = None
+        self.scale = scale
+        self.resize_buffer = None
+        self.rgb_buffer = None
+        self.recorder = recorder
+        self.min_submit_interval = 1 / inference_rate if inference_rate else 0.0
+        self.last_submit_time = -math.inf
+        self.predictor = predictor
+        # capture time of the last frame passed in, which predictions aim for
+        self.frame_time = None
+        # timestamp_ms -> Submission
+        self.in_flight = {}
+        self.in_flight_lock = threading.Lock()
+        # double buffer: the callback fills the slot the consumer isn't looking
+        # at, then publishes it by flipping `latest` (a single atomic store)
+        self.results = [None, None]
+        self.latest = 0
+        self.last_returned_sequence = -1
+        self.result_event = threading.Event()
+
+        def create_landmarker(cropped):
+            return HandLandmarker.create_from_options(
+                HandLandmarkerOptions(
+                    base_options=BaseOptions(
+                        model_asset_path=model_path,
+                        delegate=DELEGATES[delegate],
+                    ),
+                    running_mode=VisionRunningMode.LIVE_STREAM,
+                    result_callback=functools.partial(
+                        self._process_result, cropped=cropped
+                    ),
+                    **kwargs,
+                )
             )
-        )
 
-    def process_frame(self, frame: cv2.typing.MatLike):
-        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=frame)
-        self.landmarker.detect_async(mp_image, cv2.getTickCount())
+        # with `roi`, this one only sees crops, and the full frames go to
+        # `full_frame_landmarker`
+        self.landmarker = create_landmarker(cropped=roi)
+        self.full_frame_landmarker = create_landmarker(cropped=False) if roi else None
+
+    def process_frame(self, frame: cv2.typing.MatLike, capture_time=None):
+        """Submits a frame for inference, unless too many are already in flight.
+
+        Returns whether the frame was submitted.
+        """
+        now = time.monotonic()
+        if capture_time is None:
+            capture_time = now
+        self.frame_time = capture_time
+        if capture_time - self.last_submit_time < self.min_submit_interval:
+            return False
+
+        with self.in_flight_lock:
+            # mediapipe never calls back for frames it drops internally
+            for timestamp_ms, submission in list(self.in_flight.items()):
+                if now - submission.submit_time > self.in_flight_timeout:
+                    del self.in_flight[timestamp_ms]
+                    self.dropped_frames += 1
+            if len(self.in_flight) >= self.max_in_flight:
+                self.dropped_frames += 1
+                return False
+
+            timestamp_ms = max(int(capture_time * 1000), self.last_timestamp_ms + 1)
+            self.last_timestamp_ms = timestamp_ms
+            self.last_submit_time = capture_time
+            self.sequence += 1
+            height, width = frame.shape[:2]
+            region = self._next_region(width, height)
+            self.in_flight[timestamp_ms] = Submission(
+                self.sequence,
+                capture_time,
+                now,
+                region,
+                (width, height),
+                profiling.current_frame,
+            )
+
+        with profiling.span("convert"):
+            if region is not None:
+                x0, y0, x1, y1 = region
+                frame = frame[y0:y1, x0:x1]
+            # reuse the conversion buffers while the frame size stays the same
+            if self.scale != 1:
+                frame = self.resize_buffer = cv2.resize(
+                    frame,
+                    None,
+                    self.resize_buffer,
+                    fx=self.scale,
+                    fy=self.scale,
+                    interpolation=cv2.INTER_AREA,
+                )
+            self.rgb_buffer = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, self.rgb_buffer)
+            # mp.Image copies the pixels, so the buffer is free again right away
+            mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=self.rgb_buffer)
+        landmarker = self.landmarker
+        if region is None and self.full_frame_landmarker is not None:
+            landmarker = self.full_frame_landmarker
+        with profiling.span("submit", flow_start=timestamp_ms, sequence=self.sequence):
+            landmarker.detect_async(mp_image, timestamp_ms)
+        return True
+
+    def _next_region(self, width, height):
+        if not self.roi:
+            return None
+
+        self.frames_since_full_frame += 1
+        hands_box = self.hands_box
+        if (
+            hands_box is None
+            or self.frames_since_full_frame >= self.full_frame_interval
+        ):
+            self.frames_since_full_frame = 0
+            return None
+
+        # a padded square (in pixels) centred on the hands
+        x0, y0, x1, y1 = hands_box
+        size = max(
+            (x1 - x0) * width,
+            (y1 - y0) * height,
+            self.min_roi_size * min(width, height),
+        ) * (1 + 2 * self.roi_padding)
+        # the landmarker tracks hands in the crop's coordinates, which only
+        # carry over to the next crop if it's the same size
+        if self.roi_size is None or not size <= self.roi_size <= 2 * size:
+            self.roi_size = int(size)
+        size_x = min(self.roi_size, width)
+        size_y = min(self.roi_size, height)
+        if size_x >= width and size_y >= height:
+            return None
+        # moved back inside the frame rather than cut off at its edges
+        cx, cy = (x0 + x1) / 2 * width, (y0 + y1) / 2 * height
+        x0 = min(max(0, int(cx - size_x / 2)), width - size_x)
+        y0 = min(max(0, int(cy - size_y / 2)), height - size_y)
+        return x0, y0, x0 + size_x, y0 + size_y
+
+    @staticmethod
+    def _to_full_frame(result, region, frame_size):
+        x0, y0, x1, y1 = region
+        width, height = frame_size
+        scale_x, scale_y = (x1 - x0) / width, (y1 - y0) / height
+        offset_x, offset_y = x0 / width, y0 / height
+        for hand_landmarks in result.hand_landmarks:
+            for landmark in hand_landmarks:
+                landmark.x = offset_x + landmark.x * scale_x
+                landmark.y = offset_y + landmark.y * scale_y
+                landmark.z *= scale_x
 
     def _process_result(
-        self, result: HandLandmarkerResult, _output_image: mp.Image, _timestamp_ms: int
+        self,
+        result: HandLandmarkerResult,
+        _output_image: mp.Image,
+        timestamp_ms: int,
+        cropped=False,
     ):
-        self.tracking_result = result
+        result_time = time.monotonic()
+        with self.in_flight_lock:
+            # earlier frames sent to the same landmarker won't come back now
+            for earlier in [
+                t
+                for t, pending in self.in_flight.items()
+                if t < timestamp_ms and (pending.region is not None) == cropped
+            ]:
+                del self.in_flight[earlier]
+                self.dropped_frames += 1
+            submission = self.in_flight.pop(timestamp_ms, None)
 
-    def get_latest_result(self) -> HandLandmarkerResult:
-        return self.tracking_result
+        if submission is None:
+            submission = Submission(
+                -1, result_time, result_time, None, (1, 1), profiling.current_frame
+            )
+        # inference spans two threads, so it is timed from submission to here
+        end = time.perf_counter()
+        profiling.record(
+            "inference",
+            end - (result_time - submission.submit_time),
+            end,
+            submission.frame,
+            # its own track, since with max_in_flight > 1 inferences overlap
+            thread="inference",
+        )
+
+        with profiling.span(
+            "callback",
+            submission.frame,
+            flow_end=timestamp_ms,
+            sequence=submission.sequence,
+        ):
+            # with `roi`, the two landmarkers can finish out of order
+            latest = self.results[self.latest]
+            if latest is not None and submission.sequence < latest.sequence:
+                return
+            if submission.region is not None:
+                self._to_full_frame(result, submission.region, submission.frame_size)
+
+            if self.recorder is not None:
+                self.recorder.add_result(timestamp_ms, result, submission.frame_size)
+
+            if self.roi:
+                if result.hand_landmarks:
+                    points = landmarks_to_array(result)
+                    self.hands_box = (
+                        *points[..., :2].min(axis=(0, 1)).tolist(),
+                        *points[..., :2].max(axis=(0, 1)).tolist(),
+                    )
+                else:
+                    self.hands_box = None
+
+            slot = 1 - self.latest
+            self.results[slot] = FrameResult(
+                result,
+                submission.sequence,
+                submission.capture_time,
+                submission.submit_time,
+                result_time,
+            )
+            self.latest = slot
+            self.result_event.set()
+
+    def get_latest_result(self) -> FrameResult | None:
+        """Returns the latest result, with its landmarks extrapolated to the
+        last frame passed to `process_frame` if there is a predictor."""
+        result = self.results[self.latest]
+        if result is None:
+            return None
+        self.last_returned_sequence = result.sequence
+        if self.predictor is None or self.frame_time is None:
+            return result
+
+        with profiling.span("predict"):
+            self.predictor.update(result.points, result.capture_time, result.sequence)
+            predicted = dataclasses.replace(result)
+            predicted.points = self.predictor.predict(self.frame_time)
+        return predicted
+
+    def peek_result(self) -> FrameResult | None:
+        """Returns the latest result without marking it as seen by
+        `wait_for_result`."""
+        return self.results[self.latest]
+
+    def wait_for_result(self, timeout=None) -> FrameResult | None:
+        """Blocks until a result newer than the last one returned arrives.
+
+        Returns None if nothing arrives within `timeout` seconds.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            result = self.results[self.latest]
+            if result is not None and result.sequence > self.last_returned_sequence:
+                self.last_returned_sequence = result.sequence
+                return result
+
+            self.result_event.clear()
+            # a result may have landed between the check above and the clear
+            result = self.results[self.latest]
+            if result is not None and result.sequence > self.last_returned_sequence:
+                continue
+
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return None
+            if not self.result_event.wait(remaining):
+                return None
 
     def close(self):
         self.landmarker.close()
+        if self.full_frame_landmarker is not None:
+            self.full_frame_landmarker.close()
+        if self.recorder is not None:
+            self.recorder.close()
 
 
-def draw_landmarks(frame: cv2.typing.MatLike, result: HandLandmarkerResult):
-    hand_landmarks_list = result.hand_landmarks
+def open_landmarker(**kwargs):
+    """Creates an `EasyHandLandmarker` configured from the command line, or a
+    `ReplayLandmarker` if a recording was passed with --replay."""
+    # imported here because recording builds on this module
+    from common.recording import LandmarkRecorder, ReplayLandmarker
 
-    for hand_landmarks in hand_landmarks_list:
-        hand_landmarks_proto = landmark_pb2.NormalizedLandmarkList()
-        hand_landmarks_proto.landmark.extend(
-            [
-                landmark_pb2.NormalizedLandmark(
-                    x=landmark.x, y=landmark.y, z=landmark.z
-                )
-                for landmark in hand_landmarks
-            ]
+    options = get_options()
+    if options.replay:
+        landmarker = ReplayLandmarker(options.replay, realtime=options.realtime)
+    else:
+        landmarker = EasyHandLandmarker(
+            model_path=options.model,
+            delegate=options.delegate,
+            recalibrate=options.recalibrate,
+            roi=options.roi,
+            scale=options.scale,
+            inference_rate=options.inference_rate,
+            predictor=LandmarkPredictor() if options.predict else None,
+            recorder=LandmarkRecorder(options.record) if options.record else None,
+            **kwargs,
         )
-        mp_drawing.draw_landmarks(
-            frame,
-            hand_landmarks_proto,
-            mp_hands.HAND_CONNECTIONS,
+
+    get_monitor().landmarker = landmarker
+    return landmarker
+
+
+class LandmarkStyle:
+    """Precomputed drawing groups for `draw_hands`.
+
+    Takes the same `DrawingSpec` (or mapping of specs) arguments as
+    `mp_drawing.draw_landmarks`, and groups connections and landmarks by spec
+    up front so drawing a hand is one `cv2.polylines` call per connection
+    style plus a circle per landmark.
+    """
+
+    def __init__(
+        self,
+        landmark_spec=mp_drawing.DrawingSpec(color=mp_drawing.RED_COLOR),
+        connection_spec=mp_drawing.DrawingSpec(),
+        connections=mp_hands.HAND_CONNECTIONS,
+    ):
+        self.connection_groups = self._group(connections, connection_spec)
+        self.landmark_groups = (
+            self._group(range(len(HandLandmark)), landmark_spec)
+            if landmark_spec
+            else []
         )
 
+    @staticmethod
+    def _group(keys, spec):
+        # DrawingSpec isn't hashable, so group by identity
+        groups = {}
+        for key in keys:
+            key_spec = spec[key] if isinstance(spec, Mapping) else spec
+            groups.setdefault(id(key_spec), (key_spec, []))[1].append(key)
+        return [(spec, np.array(sorted(keys))) for spec, keys in groups.values()]
+
+
+DEFAULT_STYLE = LandmarkStyle()
+
+
+def draw_hands(frame: cv2.typing.MatLike, points, style=DEFAULT_STYLE):
+    with profiling.span("render"):
+        _draw_hands(frame, points, style)
+
+
+def _draw_hands(frame, points, style):
+    height, width = frame.shape[:2]
+    # same rounding and bounds rules as mp_drawing, so the output is identical
+    xy = points[..., :2].astype(np.float64)
+    visible = np.all((xy >= 0) & (xy <= 1), axis=-1)
+    size = np.array([width, height])
+    pixels = np.minimum(np.floor(xy * size), size - 1).astype(np.int32)
+
+    for hand_pixels, hand_visible in zip(pixels, visible):
+        for spec, connections in style.connection_groups:
+            connections = connections[hand_visible[connections].all(axis=-1)]
+            if len(connections):
+                cv2.polylines(
+                    frame,
+                    list(hand_pixels[connections]),
+                    False,
+                    spec.color,
+                    spec.thickness,
+                )
+
+        for spec, indices in style.landmark_groups:
+            border_radius = max(spec.circle_radius + 1, int(spec.circle_radius * 1.2))
+            for center in hand_pixels[indices[hand_visible[indices]]].tolist():
+                cv2.circle(
+                    frame, center, border_radius, mp_drawing.WHITE_COLOR, spec.thickness
+                )
+                cv2.circle(
+                    frame, center, spec.circle_radius, spec.color, spec.thickness
+                )
+
+
+def draw_landmarks(
+    frame: cv2.typing.MatLike, result: HandLandmarkerResult, style=DEFAULT_STYLE
+):
+    draw_hands(frame, landmarks_to_array(result), style)
+
 
 def fraction_to_pixels(mat, x, y):
     height, width = mat.shape[:2]
@@ -84,53 +593,49 @@ def dist_between(x1, y1, x2, y2):
     return math.hypot(y2 - y1, x2 - x1)
 
 
-def is_pinch(landmarks):
-    index = landmarks[HandLandmark.INDEX_FINGER_TIP]
-    thumb = landmarks[HandLandmark.THUMB_TIP]
-    wrist = landmarks[HandLandmark.WRIST]
+# Vectorized helpers. These work on the (hands, 21, 3) float32 arrays returned
+# by `landmarks_to_array`, so each frame pays for the landmark attribute lookups
+# once. The gestures built on them are in common/gestures.py.
 
-    thumb_to_index = dist_between_squared(thumb.x, thumb.y, index.x, index.y)
-    thumb_to_wrist = dist_between_squared(thumb.x, thumb.y, wrist.x, wrist.y)
-    index_to_wrist = dist_between_squared(index.x, index.y, wrist.x, wrist.y)
+FINGER_JOINTS = np.array(
+    [
+        range(HandLandmark.THUMB_CMC, HandLandmark.THUMB_TIP + 1),
+        range(HandLandmark.INDEX_FINGER_MCP, HandLandmark.INDEX_FINGER_TIP + 1),
+        range(HandLandmark.MIDDLE_FINGER_MCP, HandLandmark.MIDDLE_FINGER_TIP + 1),
+        range(HandLandmark.RING_FINGER_MCP, HandLandmark.RING_FINGER_TIP + 1),
+        range(HandLandmark.PINKY_MCP, HandLandmark.PINKY_TIP + 1),
+    ]
+)
 
-    return (
-        thumb_to_index / thumb_to_wrist <= 0.08
-        and thumb_to_index / index_to_wrist <= 0.2
-    )
 
+def landmarks_to_array(result: HandLandmarkerResult | FrameResult) -> np.ndarray:
+    if isinstance(result, FrameResult):
+        return result.points
 
-def atan2(p1, p2):
-    return math.atan2(p2.y - p1.y, p2.x - p1.x)
+    return np.array(
+        [
+            [(landmark.x, landmark.y, landmark.z) for landmark in hand_landmarks]
+            for hand_landmarks in result.hand_landmarks
+        ],
+        dtype=np.float32,
+    ).reshape(-1, len(HandLandmark), 3)
 
 
-def get_pinch_pointer(landmarks):
-    index = landmarks[HandLandmark.INDEX_FINGER_TIP]
-    thumb = landmarks[HandLandmark.THUMB_TIP]
-    return (index.x + thumb.x) / 2, (index.y + thumb.y) / 2
+def handedness_to_array(result: HandLandmarkerResult | FrameResult) -> np.ndarray:
+    """Returns 0 for each left hand and 1 for each right hand in a result."""
+    return np.array(
+        [hand[0].category_name == "Right" for hand in result.handedness],
+        dtype=np.uint8,
+    )
 
 
-def finger_is_up(bot, mid_bot, mid_top, top):
-    bot_to_mid = atan2(bot, mid_bot)
-    mid_to_tip = atan2(mid_top, top)
-    return abs(bot_to_mid - mid_to_tip) < math.pi / 4
+def atan2_array(points, start, end):
+    delta = points[:, end, :2] - points[:, start, :2]
+    return np.arctan2(delta[..., 1], delta[..., 0])
 
 
-def fingers_are_up(landmarks):
-    return list(
-        map(
-            lambda finger: finger_is_up(*finger),
-            [
-                landmarks[HandLandmark.THUMB_CMC : HandLandmark.THUMB_TIP + 1],
-                landmarks[
-                    HandLandmark.INDEX_FINGER_MCP : HandLandmark.INDEX_FINGER_TIP + 1
-                ],
-                landmarks[
-                    HandLandmark.MIDDLE_FINGER_MCP : HandLandmark.MIDDLE_FINGER_TIP + 1
-                ],
-                landmarks[
-                    HandLandmark.RING_FINGER_MCP : HandLandmark.RING_FINGER_TIP + 1
-                ],
-                landmarks[HandLandmark.PINKY_MCP : HandLandmark.PINKY_TIP + 1],
-            ],
-        )
-    )
+def pinch_pointers(points):
+    return (
+        points[:, HandLandmark.INDEX_FINGER_TIP, :2]
+        + points[:, HandLandmark.THUMB_TIP, :2]
+    ) / 2
@@ -0,0 +1,205 @@
+"""
+Hit testing for things that can be pinched: buttons, handles, balls...
+
+    index = HitIndex()
+    index.set_circle("handle", (x, y), 10)
+    index.hit(pointer)  # "handle", or None
+
+Shapes (circles and rectangles, in pixels) are bucketed into a grid of
+`cell_size` squares, rebuilt with a few array operations whenever they
+change, so a hit test only looks at the shapes in the pointer's cell however
+many there are. When several shapes are under the pointer, the one on the
+highest `layer` wins, and then the one whose centre is nearest.
+
+`PinchGrabs` tracks which hand holds what: a pinch grabs the shape under it
+that no other hand is holding, and keeps it until the pinch ends.
+"""
+
+from typing import Any, NamedTuple
+
+import numpy as np
+
+CIRCLE = 0
+RECT = 1
+
+GRABBED = "grabbed"
+HELD = "held"
+RELEASED = "released"
+
+
+def _cell_keys(cells):
+    # one integer per (column, row)
+    return cells[..., 0] * (1 << 32) + cells[..., 1]
+
+
+class HitIndex:
+    def __init__(self, cell_size=64):
+        self.cell_size = cell_size
+        self.clear()
+
+    def clear(self):
+        self.keys = []
+        # key -> row in the arrays below
+        self.rows = {}
+        self.kinds = np.empty(0, dtype=np.int8)
+        self.centres = np.empty((0, 2))
+        # a circle's radius twice, or a rectangle's half width and height
+        self.extents = np.empty((0, 2))
+        self.layers = np.empty(0, dtype=np.int64)
+        # (sorted cell keys, the shape in each), or None when out of date
+        self.grid = None
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self.rows
+
+    def _set(self, keys, kind, centres, extents, layer):
+        new = list(dict.fromkeys(key for key in keys if key not in self.rows))
+        if new:
+            self.rows.update(zip(new, range(len(self.keys), len(self.keys) + len(new))))
+            self.keys.extend(new)
+            self.kinds = np.resize(self.kinds, len(self.keys))
+            self.centres = np.resize(self.centres, (len(self.keys), 2))
+            self.extents = np.resize(self.extents, (len(self.keys), 2))
+            self.layers = np.resize(self.layers, len(self.keys))
+        rows = np.fromiter(map(self.rows.__getitem__, keys), np.intp, len(keys))
+        self.kinds[rows] = kind
+        self.centres[rows] = centres
+        self.extents[rows] = extents
+        self.layers[rows] = layer
+        self.grid = None
+
+    def set_circle(self, key, centre, radius, layer=0):
+        """Adds a circle, or moves the shape already under `key`."""
+        self._set([key], CIRCLE, [centre], [(radius, radius)], layer)
+
+    def set_circles(self, keys, centres, radii, layer=0):
+        """Adds or moves many circles at once: `centres` is an (n, 2) array
+        and `radii` one radius or n of them."""
+        keys = list(keys)
+        radii = np.broadcast_to(radii, len(keys))
+        self._set(keys, CIRCLE, centres, np.stack([radii, radii], axis=1), layer)
+
+    def set_rect(self, key, top_left, bottom_right, layer=0):
+        """Adds a rectangle, or moves the shape already under `key`."""
+        (x1, y1), (x2, y2) = top_left, bottom_right
+        self._set(
+            [key],
+            RECT,
+            [((x1 + x2) / 2, (y1 + y2) / 2)],
+            [(abs(x2 - x1) / 2, abs(y2 - y1) / 2)],
+            layer,
+        )
+
+    def remove(self, key):
+        row = self.rows.pop(key)
+        last = len(self.keys) - 1
+        # the last shape fills the gap
+        if row != last:
+            moved = self.keys[last]
+            self.keys[row] = moved
+            self.rows[moved] = row
+            for array in (self.kinds, self.centres, self.extents, self.layers):
+                array[row] = array[last]
+        self.keys.pop()
+        self.kinds = self.kinds[:last]
+        self.centres = self.centres[:last]
+        self.extents = self.extents[:last]
+        self.layers = self.layers[:last]
+        self.grid = None
+
+    def _build(self):
+        low = np.floor((self.centres - self.extents) / self.cell_size).astype(np.int64)
+        high = np.floor((self.centres + self.extents) / self.cell_size).astype(np.int64)
+        spans = high - low + 1
+        counts = spans[:, 0] * spans[:, 1]
+        # a shape goes in every cell its bounding box touches
+        shapes = np.repeat(np.arange(len(self.keys)), counts)
+        within = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        rows = spans[shapes, 1]
+        cells = low[shapes] + np.stack([within // rows, within % rows], axis=1)
+        cell_keys = _cell_keys(cells)
+        order = np.argsort(cell_keys, kind="stable")
+        self.grid = cell_keys[order], shapes[order]
+
+    def hit(self, point, exclude=()):
+        """Returns the key of the shape at `point` (x, y), skipping those in
+        `exclude`, or None if there isn't one."""
+        if not self.keys:
+            return None
+        if self.grid is None:
+            self._build()
+        cell_keys, shapes = self.grid
+        point = np.asarray(point, dtype=np.float64)
+        cell = _cell_keys(np.floor(point / self.cell_size).astype(np.int64))
+        start = np.searchsorted(cell_keys, cell, "left")
+        stop = np.searchsorted(cell_keys, cell, "right")
+        candidates = shapes[start:stop]
+        if exclude:
+            candidates = [row for row in candidates if self.keys[row] not in exclude]
+        if not len(candidates):
+            return None
+
+        offsets = np.abs(self.centres[candidates] - point)
+        extents = self.extents[candidates]
+        distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        inside = np.where(
+            self.kinds[candidates] == CIRCLE,
+            distances <= extents[:, 0],
+            np.all(offsets <= extents, axis=1),
+        )
+        if not inside.any():
+            return None
+        # topmost first, then nearest
+        best = np.lexsort((distances, -self.layers[candidates], ~inside))[0]
+        return self.keys[candidates[best]]
+
+
+class Grab(NamedTuple):
+    key: Any
+    # GRABBED on the frame it's picked up, HELD after that, and RELEASED on
+    # the frame it's let go
+    state: str
+
+
+class PinchGrabs:
+    """Which hand (by track ID) is holding which of `index`'s shapes."""
+
+    def __init__(self, index):
+        self.index = index
+        # hand ID -> key
+        self.holding = {}
+
+    def update(self, hand_id, is_pinching, point):
+        """Returns a `Grab` of what the hand is holding or just let go of, or
+        None. A pinching hand that holds nothing grabs the shape under it."""
+        key = self.holding.get(hand_id)
+        if not is_pinching:
+            if key is None:
+                return None
+            del self.holding[hand_id]
+            return Grab(key, RELEASED)
+        if key is not None:
+            return Grab(key, HELD)
+
+        key = self.index.hit(point, exclude=set(self.holding.values()))
+        if key is None:
+            return None
+        self.holding[hand_id] = key
+        return Grab(key, GRABBED)
+
+    def holder(self, key):
+        """Returns the ID of the hand holding `key`, or None."""
+        for hand_id, held in self.holding.items():
+            if held == key:
+                return hand_id
+        return None
+
+    def drop(self, hand_ids):
+        """Lets go of whatever `hand_ids` (e.g. lost tracks) were holding, and
+        returns those keys."""
+        return [
+            self.holding.pop(hand_id) for hand_id in hand_ids if hand_id in self.holding
+        ]
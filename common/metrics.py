@@ -0,0 +1,305 @@
+"""
+Live performance numbers for the frame loop.
+
+`PerfMonitor` is a profiling sink (see common/profiling.py) that keeps a
+rolling frame rate, a histogram of every stage's time, the age of the result
+each frame was drawn with, and dropped frame counts from the capture and the
+landmarker. Every script gets one through `get_monitor`. It only starts
+listening to spans once it's needed (with --hud or --metrics, or the first
+time the overlay is shown), so runs without either pay nothing for it:
+
+- press 'p' to toggle an overlay with the last couple of seconds' numbers,
+  where any stage over its budget is shown in red (or start with --hud)
+- pass --metrics to export the numbers in the Prometheus text format, either
+  to a file that is rewritten every second (for node_exporter's textfile
+  collector, say) or over HTTP when given a HOST:PORT
+"""
+
+import bisect
+import functools
+import http.server
+import os
+import threading
+import time
+from collections import defaultdict, deque
+
+import cv2
+
+from common import profiling
+from common.options import get_options
+
+TOGGLE_KEY = ord("p")
+# histogram bucket bounds, in seconds
+BUCKETS = [0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0]
+# what each stage can take (at the 90th percentile) and still keep up with a
+# 30 fps camera, in milliseconds
+BUDGETS_MS = {
+    "capture_wait": 33,
+    "inference": 33,
+    "result_age": 100,
+}
+DEFAULT_BUDGET_MS = 5
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def export(self, name, labels=""):
+        lines = []
+        cumulative = 0
+        for bound, count in zip([*self.buckets, "+Inf"], self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels}le="{bound}"}} {cumulative}')
+        labels = "{" + labels.rstrip(",") + "}" if labels else ""
+        lines.append(f"{name}_sum{labels} {self.sum}")
+        lines.append(f"{name}_count{labels} {self.count}")
+        return lines
+
+
+class PerfMonitor:
+    def __init__(self, window=2.0):
+        self.window = window
+        self.lock = threading.Lock()
+        self.histograms = defaultdict(Histogram)
+        self.result_age = Histogram()
+        # stage -> (time, seconds) over the last `window` seconds
+        self.recent = defaultdict(deque)
+        self.frame_times = deque()
+        self.frames = 0
+        self.capture = None
+        self.landmarker = None
+        self.hud_visible = False
+        # whether it's been installed as a sink yet, see `start`
+        self.started = False
+        self.exporter = None
+        # seconds from launch to each startup milestone, see common/runtime.py
+        self.startup = {}
+
+    def start(self):
+        """Starts recording spans and results, if it isn't already."""
+        if not self.started:
+            self.started = True
+            profiling.add_sink(self)
+
+    def __call__(self, span):
+        end = span.start + span.duration
+        with self.lock:
+            stage = span.name
+            self.histograms[stage].observe(span.self_time)
+            self._add_recent(stage, end, span.self_time)
+            if span.name == "frame":
+                self.frames += 1
+                self.frame_times.append(end)
+                self._trim(self.frame_times, end)
+
+    def _add_recent(self, stage, now, seconds):
+        recent = self.recent[stage]
+        recent.append((now, seconds))
+        while recent and recent[0][0] < now - self.window:
+            recent.popleft()
+
+    def _trim(self, times, now):
+        while times and times[0] < now - self.window:
+            times.popleft()
+
+    def observe_result(self, result, now=None):
+        """Records the age of the result a frame is about to be drawn with."""
+        if result is None or not self.started:
+            return
+        now = time.perf_counter() if now is None else now
+        age = result.age()
+        with self.lock:
+            self.result_age.observe(age)
+            self._add_recent("result_age", now, age)
+
+    def fps(self):
+        with self.lock:
+            self._trim(self.frame_times, time.perf_counter())
+            if len(self.frame_times) < 2:
+                return 0.0
+            return (len(self.frame_times) - 1) / (
+                self.frame_times[-1] - self.frame_times[0]
+            )
+
+    def dropped_frames(self):
+        sources = {"capture": self.capture, "landmarker": self.landmarker}
+        return {
+            name: source.dropped_frames
+            for name, source in sources.items()
+            if source is not None
+        }
+
+    def summary(self):
+        """Returns the p50 and p90 of each stage over the window, in ms."""
+        now = time.perf_counter()
+        with self.lock:
+            recent = {}
+            for stage, values in self.recent.items():
+                while values and values[0][0] < now - self.window:
+                    values.popleft()
+                if values:
+                    recent[stage] = [seconds for _, seconds in values]
+        summary = {}
+        for stage, values in recent.items():
+            # a handful of values each, where sorting beats np.percentile
+            values.sort()
+            summary[stage] = tuple(
+                values[int(q * (len(values) - 1))] * 1000 for q in (0.5, 0.9)
+            )
+        return summary
+
+    def draw(self, frame: cv2.typing.MatLike):
+        """Overlays the current numbers on the top left of the frame."""
+        with profiling.span("hud"):
+            summary = self.summary()
+            dropped = ", ".join(
+                f"{source} {count}" for source, count in self.dropped_frames().items()
+            )
+            lines = [(f"{self.fps():.1f} fps", (255, 255, 255))]
+            if dropped:
+                lines.append((f"dropped: {dropped}", (255, 255, 255)))
+            for stage in sorted(summary, key=lambda s: -summary[s][1]):
+                p50, p90 = summary[stage]
+                over = p90 > BUDGETS_MS.get(stage, DEFAULT_BUDGET_MS)
+                lines.append(
+                    (
+                        f"{stage:<12} {p50:6.1f} {p90:6.1f} ms",
+                        (0, 0, 255) if over else (255, 255, 255),
+                    )
+                )
+
+            height = 18 * len(lines) + 10
+            hud = frame[:height, :300]
+            hud[:] = hud // 3
+            for i, (text, color) in enumerate(lines):
+                cv2.putText(
+                    frame,
+                    text,
+                    (8, 20 + 18 * i),
+                    cv2.FONT_HERSHEY_PLAIN,
+                    1,
+                    color,
+                    1,
+                    cv2.LINE_AA,
+                )
+
+    def export(self):
+        """Returns every metric in the Prometheus text exposition format."""
+        fps = self.fps()
+        lines = [
+            "# HELP handiwork_fps Frame rate over the last few seconds.",
+            "# TYPE handiwork_fps gauge",
+            f"handiwork_fps {fps}",
+            "# HELP handiwork_frames_total Frames run through the main loop.",
+            "# TYPE handiwork_frames_total counter",
+            f"handiwork_frames_total {self.frames}",
+            "# HELP handiwork_dropped_frames_total Frames dropped before inference.",
+            "# TYPE handiwork_dropped_frames_total counter",
+        ]
+        for source, count in self.dropped_frames().items():
+            lines.append(f'handiwork_dropped_frames_total{{source="{source}"}} {count}')
+        lines += [
+            "# HELP handiwork_startup_seconds Time from launch to each startup step.",
+            "# TYPE handiwork_startup_seconds gauge",
+        ]
+        for step, seconds in self.startup.items():
+            lines.append(f'handiwork_startup_seconds{{step="{step}"}} {seconds}')
+        with self.lock:
+            lines += [
+                "# HELP handiwork_stage_seconds Time spent in each stage of a frame.",
+                "# TYPE handiwork_stage_seconds histogram",
+            ]
+            for stage, histogram in sorted(self.histograms.items()):
+                lines += histogram.export(
+                    "handiwork_stage_seconds", f'stage="{stage}",'
+                )
+            lines += [
+                "# HELP handiwork_result_age_seconds Age of the landmarks each frame"
+                " was drawn with, from capture.",
+                "# TYPE handiwork_result_age_seconds histogram",
+                *self.result_age.export("handiwork_result_age_seconds"),
+            ]
+        return "\n".join(lines) + "\n"
+
+
+class MetricsExporter:
+    """Publishes a monitor's `export` either to a file, rewritten every
+    `interval` seconds, or over HTTP if `target` is HOST:PORT (or :PORT)."""
+
+    def __init__(self, monitor, target, interval=1.0):
+        self.monitor = monitor
+        self.target = target
+        self.interval = interval
+        self.stopped = threading.Event()
+        host, _, port = target.rpartition(":")
+        if port.isdigit() and "/" not in target:
+            self.server = http.server.ThreadingHTTPServer(
+                (host, int(port)), self._handler()
+            )
+            self.server.daemon_threads = True
+            self.thread = threading.Thread(
+                target=self.server.serve_forever, daemon=True
+            )
+        else:
+            self.server = None
+            self.thread = threading.Thread(target=self._write_file, daemon=True)
+        self.thread.start()
+
+    def _handler(self):
+        monitor = self.monitor
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = monitor.export().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *_args):
+                pass
+
+        return Handler
+
+    def _write_file(self):
+        tmp_path = self.target + ".tmp"
+        while True:
+            stopped = self.stopped.wait(self.interval)
+            with open(tmp_path, "w") as f:
+                f.write(self.monitor.export())
+            # atomically, so a scraper never sees half a file
+            os.replace(tmp_path, self.target)
+            # written once more on the way out, so the end of the run is in it
+            if stopped:
+                return
+
+    def close(self):
+        """Stops the server, or writes the file one last time."""
+        self.stopped.set()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+        self.thread.join()
+
+
+@functools.cache
+def get_monitor():
+    """Returns the process's `PerfMonitor`, set up from the command line."""
+    options = get_options()
+    monitor = PerfMonitor()
+    monitor.hud_visible = options.hud
+    if options.hud or options.metrics:
+        monitor.start()
+    if options.metrics:
+        monitor.exporter = MetricsExporter(monitor, options.metrics)
+    return monitor
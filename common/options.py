@@ -0,0 +1,108 @@
+"""
+Command line options shared by every script.
+
+Scripts don't define their own arguments, so these are parsed leniently: any
+flag that isn't recognised here is left alone.
+"""
+
+import argparse
+import functools
+
+parser = argparse.ArgumentParser(add_help=False)
+parser.add_argument(
+    "--camera",
+    type=int,
+    default=2,
+    help="camera index to capture from (0 is usually the default camera)",
+)
+parser.add_argument(
+    "--video",
+    help="read frames from this video file instead of a camera",
+)
+parser.add_argument(
+    "--model",
+    default="hand_landmarker.task",
+    help="path to the hand landmarker model bundle",
+)
+parser.add_argument(
+    "--delegate",
+    choices=["cpu", "gpu", "auto"],
+    default="gpu",
+    help="inference delegate; 'auto' picks the fastest one on this machine",
+)
+parser.add_argument(
+    "--recalibrate",
+    action="store_true",
+    help="with --delegate auto, ignore the cached calibration",
+)
+parser.add_argument(
+    "--roi",
+    action="store_true",
+    help="only submit a crop around the tracked hands, with periodic full frames",
+)
+parser.add_argument(
+    "--scale",
+    type=float,
+    default=1.0,
+    help="downscale frames by this factor before inference",
+)
+parser.add_argument(
+    "--inference-rate",
+    type=float,
+    metavar="HZ",
+    help="submit at most this many frames a second for inference",
+)
+parser.add_argument(
+    "--predict",
+    action="store_true",
+    help="extrapolate landmarks for the frames between inference results",
+)
+parser.add_argument(
+    "--record",
+    help="save the session's landmarks to this file",
+)
+parser.add_argument(
+    "--replay",
+    help="replay landmarks from a recording instead of running the model",
+)
+parser.add_argument(
+    "--realtime",
+    action="store_true",
+    help="with --replay, keep the recording's original pacing",
+)
+parser.add_argument(
+    "--hud",
+    action="store_true",
+    help="start with the performance overlay shown (toggle it with 'p')",
+)
+parser.add_argument(
+    "--metrics",
+    metavar="FILE_OR_HOST:PORT",
+    help="export performance metrics to this file, or serve them over HTTP",
+)
+parser.add_argument(
+    "--trace",
+    metavar="FILE",
+    help="write a Chrome trace-event file of every frame's stages",
+)
+parser.add_argument(
+    "--volume-backend",
+    choices=["pulse", "wpctl", "fake"],
+    help="how to control the system volume (see common/volume.py)",
+)
+parser.add_argument(
+    "--autosave",
+    metavar="FILE",
+    help="keep what's drawn in draw.py saved to this file and an .svg next to it",
+)
+parser.add_argument(
+    "--headless",
+    action="store_true",
+    help="don't draw or open a window; take keys from stdin and signals",
+)
+
+
+@functools.cache
+def get_options():
+    options, _ = parser.parse_known_args()
+    return options
@@ -0,0 +1,317 @@
+"""
+A NumPy ball world: every ball's position, velocity and radius live in arrays,
+so a step is a handful of array operations rather than a loop over the balls.
+Its cost still grows with the number of balls and contacts: on one core, a
+pile of 1000 small balls takes about 5 ms a step, 2000 about 14 ms and 3000
+about 24 ms. So stepping at 60 Hz on one core tops out at around 2000 balls,
+not the thousands it was meant for. `python -m common.physics` measures it.
+
+The world steps at a fixed `rate`, independent of the frame rate: `advance`
+is given the time that passed and runs as many steps as fit in it. Gravity,
+damping and resistance are given per tick of `REFERENCE_RATE`, the frame rate
+ball.py was tuned at, and scaled to the step length, so the balls move the
+same way at any step rate.
+
+Balls bounce off the walls as they always have in ball.py, and off each
+other. Colliding pairs are found with a uniform grid as wide as the biggest
+ball: balls are sorted by cell, and each one is only checked against the
+balls in its own and neighbouring cells. Every touching pair is then resolved
+at once, a few rounds a step, which keeps piles of balls calm but lets deep
+ones settle a little into each other. Balls squeezed onto the same spot are
+pushed apart towards the middle of the box, fanned out by index.
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+REFERENCE_RATE = 30
+# most steps run by one `advance`, so a stall doesn't snowball
+MAX_STEPS = 8
+# collisions are resolved for every pair at once, so a ball in a pile only
+# settles after a few rounds
+SOLVER_ITERATIONS = 4
+# how close (in sums of radii) two balls must be at the start of a step to be
+# checked in its rounds
+NEAR = 1.25
+# spreads the directions given to balls that sit exactly on top of each other
+GOLDEN_ANGLE = np.pi * (3 - np.sqrt(5))
+# the cell, and the cells after it, that every cell is checked against, so
+# each neighbouring pair of cells is visited once
+NEIGHBOUR_CELLS = np.array([(0, 0), (1, -1), (1, 0), (1, 1), (0, 1)])
+# what the pile check in main() allows: the most balls on one spot, and the
+# most steps in a row a pair can stay there
+MAX_STACK = 4
+MAX_COINCIDENT_STEPS = 2
+
+
+def _between(vectors, first, second):
+    # `take` gathers rows many times faster than fancy indexing does
+    return np.take(vectors, second, axis=0) - np.take(vectors, first, axis=0)
+
+
+class BallWorld:
+    """Balls in a `size` (width, height) box, in pixels. Velocities are in
+    pixels per reference tick. Balls marked in `held` are moved by whoever
+    is holding them: they aren't integrated, and in collisions they push
+    others without being pushed themselves."""
+
+    def __init__(
+        self,
+        size,
+        positions,
+        radii,
+        velocities=None,
+        gravity=3,
+        bounce_damping=0.3,
+        horizontal_resistance=0.05,
+        rate=60,
+    ):
+        self.size = size
+        self.positions = np.array(positions, dtype=np.float64).reshape(-1, 2)
+        self.radii = np.broadcast_to(
+            np.asarray(radii, dtype=np.float64), len(self.positions)
+        ).copy()
+        self.velocities = (
+            np.zeros_like(self.positions)
+            if velocities is None
+            else np.array(velocities, dtype=np.float64).reshape(-1, 2)
+        )
+        self.held = np.zeros(len(self.positions), dtype=bool)
+        self.gravity = gravity
+        self.bounce_damping = bounce_damping
+        self.horizontal_resistance = horizontal_resistance
+        self.rate = rate
+        self.accumulator = 0.0
+        self.collisions = 0
+
+    def __len__(self):
+        return len(self.positions)
+
+    def advance(self, seconds):
+        """Runs the steps that fit in `seconds` (plus what was left over last
+        time). Returns how many ran."""
+        self.accumulator += seconds
+        steps = int(self.accumulator * self.rate)
+        self.accumulator -= steps / self.rate
+        if steps > MAX_STEPS:
+            steps = MAX_STEPS
+            self.accumulator = 0.0
+        for _ in range(steps):
+            self.step()
+        return steps
+
+    def step(self):
+        # fraction of a reference tick
+        h = REFERENCE_RATE / self.rate
+        free = ~self.held
+        velocities = self.velocities[free]
+        positions = self.positions[free]
+        radii = self.radii[free]
+        width, height = self.size
+
+        velocities[:, 1] += self.gravity * h
+        velocities[:, 0] *= (1 - self.horizontal_resistance) ** h
+
+        # bounce off whichever walls the step would cross
+        # (and are heading out of: one pushed into a wall by another ball
+        # would otherwise turn round every step)
+        x, y = (positions + velocities * h).T
+        vx, vy = velocities.T
+        velocities[
+            ((x - radii < 0) & (vx < 0)) | ((x + radii > width) & (vx > 0)), 0
+        ] *= -1
+        velocities[(y + radii > height) & (vy > 0), 1] *= -(1 - self.bounce_damping)
+        velocities[(y - radii < 0) & (vy < 0), 1] *= -1
+
+        self.positions[free] = positions + velocities * h
+        self.velocities[free] = velocities
+        first, second = self.candidate_pairs()
+        # the rounds only go over pairs touching or nearly touching now,
+        # which are far fewer than the grid's candidates
+        delta = _between(self.positions, first, second)
+        reach = NEAR * (self.radii[first] + self.radii[second])
+        near = np.einsum("ij,ij->i", delta, delta) < reach**2
+        near = np.flatnonzero(near)
+        first, second = first.take(near), second.take(near)
+        for _ in range(SOLVER_ITERATIONS):
+            self._collide(first, second)
+            self._keep_inside()
+
+    def _keep_inside(self):
+        # balls pushed into a wall by others stop against it, so the ones
+        # above a ball on the floor rest on it instead of sinking
+        low = self.radii[:, None]
+        high = np.array(self.size) - low
+        outside = (self.positions <= low) & (self.velocities < 0)
+        outside |= (self.positions >= high) & (self.velocities > 0)
+        self.velocities[outside] = 0
+        np.clip(self.positions, low, high, out=self.positions)
+
+    def candidate_pairs(self):
+        """Returns two arrays of ball indices, each pair close enough to
+        maybe touch, every pair once."""
+        if len(self) < 2:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+
+        cell_size = 2 * self.radii.max()
+        cells = np.floor(self.positions / cell_size).astype(np.int64)
+        # a border of empty cells all round, so neighbours never wrap
+        cells -= cells.min(axis=0) - 1
+        rows = cells[:, 1].max() + 2
+        keys = cells[:, 0] * rows + cells[:, 1]
+        order = np.argsort(keys, kind="stable")
+        # how many balls are in each cell, and where they start in `order`
+        cell_counts = np.bincount(keys, minlength=(cells[:, 0].max() + 2) * rows)
+        cell_starts = np.cumsum(cell_counts) - cell_counts
+
+        firsts, seconds = [], []
+        for dx, dy in NEIGHBOUR_CELLS:
+            neighbour_keys = keys + dx * rows + dy
+            start = cell_starts[neighbour_keys]
+            counts = cell_counts[neighbour_keys]
+            # every ball paired with every ball in the neighbouring cell
+            first = np.repeat(np.arange(len(self)), counts)
+            offsets = np.arange(counts.sum()) - np.repeat(
+                np.cumsum(counts) - counts, counts
+            )
+            second = order[np.repeat(start, counts) + offsets]
+            if dx == 0 and dy == 0:
+                # the same cell: each pair once, and no ball with itself
+                keep = first < second
+                first, second = first[keep], second[keep]
+            firsts.append(first)
+            seconds.append(second)
+        return np.concatenate(firsts), np.concatenate(seconds)
+
+    def _collide(self, first, second):
+        delta = _between(self.positions, first, second)
+        distance_squared = np.einsum("ij,ij->i", delta, delta)
+        reach = self.radii[first] + self.radii[second]
+        touching = distance_squared < reach**2
+        # two held balls don't move each other
+        touching &= ~(self.held[first] & self.held[second])
+        touching = np.flatnonzero(touching)
+        first, second = first.take(touching), second.take(touching)
+        self.collisions = len(first)
+        if not len(first):
+            return
+
+        distance = np.sqrt(distance_squared.take(touching))
+        delta = delta.take(touching, axis=0)
+        # balls at the same spot (usually both pushed into a corner) have no
+        # direction between them; the second is sent towards the middle of the
+        # box, where there's room, with a little spread by index so a stack
+        # fans out (and a fixed direction for a stack right in the middle)
+        stacked = distance == 0
+        if stacked.any():
+            towards_middle = np.array(self.size) / 2 - self.positions[second[stacked]]
+            angle = GOLDEN_ANGLE * (first[stacked] * len(self) + second[stacked])
+            spread = np.stack([np.cos(angle), np.sin(angle)], axis=1)
+            length = np.hypot(towards_middle[:, 0], towards_middle[:, 1])
+            delta[stacked] = np.where(
+                length[:, None] > 0,
+                towards_middle / np.maximum(length, 1e-9)[:, None] + 0.25 * spread,
+                spread,
+            )
+            distance[stacked] = np.hypot(delta[stacked, 0], delta[stacked, 1])
+        normal = delta / distance[:, None]
+        distance[stacked] = 0.0
+        overlap = reach.take(touching) - distance
+        # mass goes with area; held balls are immovable
+        inverse_mass = np.where(self.held, 0.0, 1 / self.radii**2)
+        first_share = inverse_mass[first] / (inverse_mass[first] + inverse_mass[second])
+        # the first of a stacked pair is stuck against the wall, so the second
+        # moves all the way out (unless it's held)
+        first_share[stacked & ~self.held[second]] = 0.0
+
+        # push the pair apart, and stop them closing in. Only real impacts
+        # bounce: resting contacts (closing no faster than a tick of gravity)
+        # just stop, or a pile of balls, all resolved at once, would pump
+        # energy into itself
+        closing = np.einsum(
+            "ij,ij->i", _between(self.velocities, first, second), normal
+        )
+        h = REFERENCE_RATE / self.rate
+        restitution = np.where(
+            closing < -2 * self.gravity * h, 1 - self.bounce_damping, 0.0
+        )
+        impulse = np.where(closing < 0, -(1 + restitution) * closing, 0.0)
+        n = len(self)
+        # every contact is resolved at once, so a ball touching several others
+        # gets the average of their kicks rather than the sum, which would
+        # overshoot and pump energy into piles of balls
+        contacts = np.maximum(
+            np.bincount(first, minlength=n) + np.bincount(second, minlength=n), 1
+        )
+        for axis in range(2):
+            push = normal[:, axis] * overlap
+            kick = normal[:, axis] * impulse
+            self.positions[:, axis] += np.bincount(
+                second, push * (1 - first_share), n
+            ) - np.bincount(first, push * first_share, n)
+            self.velocities[:, axis] += (
+                np.bincount(second, kick * (1 - first_share), n)
+                - np.bincount(first, kick * first_share, n)
+            ) / contacts
+
+
+def _coincident_pairs(world):
+    first, second = world.candidate_pairs()
+    same = np.all(world.positions[first] == world.positions[second], axis=1)
+    return set(zip(first[same].tolist(), second[same].tolist()))
+
+
+def check_pile(count, steps=1200, size=(1280, 720), radius=5, seed=0):
+    """Drops `count` balls into a pile and returns (how many pairs end up on
+    the same spot, the most balls stacked on one, the longest any pair stayed
+    on the same spot in steps, the median milliseconds per step over the last
+    quarter)."""
+    rng = np.random.default_rng(seed)
+    world = BallWorld(
+        size, rng.random((count, 2)) * size, radius, rng.normal(0, 5, (count, 2))
+    )
+    times = []
+    # pair -> how many steps in a row it's been coincident
+    streaks = {}
+    longest = 0
+    for _ in range(steps):
+        start = time.perf_counter()
+        world.step()
+        times.append(time.perf_counter() - start)
+        streaks = {pair: streaks.get(pair, 0) + 1 for pair in _coincident_pairs(world)}
+        longest = max(longest, *streaks.values(), 0)
+    _, stacks = np.unique(world.positions, axis=0, return_counts=True)
+    return len(streaks), stacks.max(), longest, 1000 * np.median(times[-steps // 4 :])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m common.physics",
+        description="Piles balls into a box and checks none end up stuck on "
+        "top of each other.",
+    )
+    parser.add_argument("--balls", type=int, nargs="+", default=[1000, 2000, 3000])
+    parser.add_argument("--steps", type=int, default=1200)
+    args = parser.parse_args(argv)
+
+    failed = False
+    for count in args.balls:
+        pairs, stack, longest, milliseconds = check_pile(count, args.steps)
+        # a pair squeezed into a corner can land on the same spot, but it
+        # should be pushed apart again straight away
+        ok = stack <= MAX_STACK and longest <= MAX_COINCIDENT_STEPS
+        failed |= not ok
+        print(
+            f"{count:>6} balls  {milliseconds:6.2f} ms/step  "
+            f"coincident pairs {pairs}  biggest stack {stack}  "
+            f"longest coincident {longest} steps  "
+            f"{'ok' if ok else 'FAILED'}"
+        )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""
+Lightweight span instrumentation for the frame loop.
+
+The capture thread, the landmarker, the runtime's calls into the demos,
+drawing and display code mark their stages with `span`. Nothing is recorded unless a sink has been installed with
+`add_sink`, so the calls cost next to nothing in normal runs.
+
+Each main-loop iteration is wrapped in a "frame" span, started by the capture
+`read` through `next_frame`. Spans nest per thread, and every finished span
+reports its self time (its duration minus nested spans on the same thread).
+The runtime wraps the demos' `update` in a "gesture" span and their `render`
+in a "render" span, so what's left of a "frame" span is the runtime's own
+work, like tracking hands.
+"""
+
+import threading
+import time
+from collections.abc import Callable
+from contextlib import contextmanager
+from typing import NamedTuple
+
+
+class Span(NamedTuple):
+    name: str
+    thread: str
+    start: float
+    duration: float
+    self_time: float
+    frame: int
+    args: dict
+
+
+sinks: list[Callable[[Span], object]] = []
+current_frame = 0
+_local = threading.local()
+
+
+def add_sink(sink):
+    """Installs a callable that receives every finished `Span`."""
+    sinks.append(sink)
+
+
+def remove_sink(sink):
+    sinks.remove(sink)
+
+
+def _stack():
+    try:
+        return _local.stack
+    except AttributeError:
+        _local.stack = []
+        return _local.stack
+
+
+def _emit(span):
+    for sink in sinks:
+        sink(span)
+
+
+def begin(name, frame=None, **args):
+    if sinks:
+        _stack().append(
+            [
+                name,
+                time.perf_counter(),
+                0.0,
+                current_frame if frame is None else frame,
+                args,
+            ]
+        )
+
+
+def end():
+    stack = _stack()
+    if not stack:
+        return
+    name, start, child_time, frame, args = stack.pop()
+    duration = time.perf_counter() - start
+    if stack:
+        stack[-1][2] += duration
+    _emit(
+        Span(
+            name,
+            threading.current_thread().name,
+            start,
+            duration,
+            duration - child_time,
+            frame,
+            args,
+        )
+    )
+
+
+@contextmanager
+def span(name, frame=None, **args):
+    begin(name, frame, **args)
+    try:
+        yield
+    finally:
+        end()
+
+
+def record(name, start, end_time, frame=None, thread=None, **args):
+    """Reports a span that was timed elsewhere, e.g. an inference that started
+    on the main thread and finished on a callback thread."""
+    if sinks:
+        _emit(
+            Span(
+                name,
+                thread or threading.current_thread().name,
+                start,
+                end_time - start,
+                end_time - start,
+                current_frame if frame is None else frame,
+                args,
+            )
+        )
+
+
+def next_frame():
+    """Marks the start of a new main-loop iteration."""
+    global current_frame
+
+    stack = _stack()
+    # close everything from the previous iteration, including its frame span
+    while stack:
+        end()
+    current_frame += 1
+    begin("frame")
@@ -0,0 +1,259 @@
+"""
+Compact landmark recordings, and a landmarker that replays them.
+
+A recording is a single little-endian file laid out so every array can be
+memory-mapped in place:
+
+    header       64 bytes, see HEADER
+    points       float32[hands, 21, 3], streamed to disk as frames arrive
+    timestamps   int64[frames], milliseconds
+    hand_counts  uint8[frames], hands in each frame
+    handedness   uint8[hands], 0 for left and 1 for right
+
+The points of frame i are hands `offsets[i]:offsets[i + 1]`, where `offsets` is
+the running sum of `hand_counts`.
+"""
+
+import mmap
+import struct
+import time
+from array import array
+
+import numpy as np
+from mediapipe.tasks.python.components.containers.category import Category
+from mediapipe.tasks.python.components.containers.landmark import NormalizedLandmark
+
+from common.hands import (
+    FrameResult,
+    HandLandmarkerResult,
+    handedness_to_array,
+    landmarks_to_array,
+)
+
+MAGIC = b"HWLM"
+VERSION = 1
+# magic, version, width, height, frames, hands, and the byte offsets of the
+# points, timestamps, hand_counts and handedness arrays
+HEADER = struct.Struct("<4sIIIQQQQQQ")
+POINTS_OFFSET = 64
+HANDEDNESS_NAMES = ["Left", "Right"]
+
+
+def _align(offset, alignment=64):
+    return -(-offset // alignment) * alignment
+
+
+class LandmarkRecorder:
+    def __init__(self, path, frame_size=(0, 0)):
+        self.file = open(path, "wb")
+        self.file.write(bytes(POINTS_OFFSET))
+        self.frame_size = frame_size
+        self.timestamps = array("q")
+        self.hand_counts = array("B")
+        self.handedness = array("B")
+
+    def add(self, timestamp_ms, points, handedness, frame_size=None):
+        """Appends one frame: a (hands, 21, 3) array and a 0/1 per hand."""
+        if frame_size is not None:
+            self.frame_size = frame_size
+        self.file.write(np.ascontiguousarray(points, dtype=np.float32).tobytes())
+        self.timestamps.append(timestamp_ms)
+        self.hand_counts.append(len(points))
+        self.handedness.extend(handedness)
+
+    def add_result(self, timestamp_ms, result, frame_size=None):
+        self.add(
+            timestamp_ms,
+            landmarks_to_array(result),
+            handedness_to_array(result),
+            frame_size,
+        )
+
+    def close(self):
+        if self.file.closed:
+            return
+
+        offsets = []
+        for values in (self.timestamps, self.hand_counts, self.handedness):
+            offset = _align(self.file.tell())
+            self.file.write(bytes(offset - self.file.tell()))
+            self.file.write(values.tobytes())
+            offsets.append(offset)
+
+        self.file.seek(0)
+        self.file.write(
+            HEADER.pack(
+                MAGIC,
+                VERSION,
+                *self.frame_size,
+                len(self.timestamps),
+                len(self.handedness),
+                POINTS_OFFSET,
+                *offsets,
+            )
+        )
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class LandmarkRecording:
+    """A memory-mapped, read-only view of a recording."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (
+            magic,
+            version,
+            width,
+            height,
+            frames,
+            hands,
+            points_offset,
+            timestamps_offset,
+            hand_counts_offset,
+            handedness_offset,
+        ) = HEADER.unpack_from(self.mmap)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a landmark recording (or wasn't closed)")
+
+        self.frame_size = width, height
+        self.points = np.frombuffer(
+            self.mmap, np.float32, hands * 21 * 3, points_offset
+        ).reshape(hands, 21, 3)
+        self.timestamps = np.frombuffer(self.mmap, np.int64, frames, timestamps_offset)
+        self.hand_counts = np.frombuffer(
+            self.mmap, np.uint8, frames, hand_counts_offset
+        )
+        self.handedness = np.frombuffer(self.mmap, np.uint8, hands, handedness_offset)
+        self.offsets = np.concatenate(
+            [[0], np.cumsum(self.hand_counts, dtype=np.int64)]
+        )
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def frame(self, index):
+        """Returns the timestamp, points and handedness of one frame."""
+        start, end = self.offsets[index], self.offsets[index + 1]
+        return (
+            int(self.timestamps[index]),
+            self.points[start:end],
+            self.handedness[start:end],
+        )
+
+    def close(self):
+        self.points = self.timestamps = self.hand_counts = self.handedness = None
+        try:
+            self.mmap.close()
+        except BufferError:
+            # someone still holds a view of a frame; the mapping goes away with it
+            pass
+
+
+def points_to_result(points, handedness):
+    """Builds a `HandLandmarkerResult` from recorded arrays."""
+    return HandLandmarkerResult(
+        handedness=[
+            [
+                Category(
+                    index=int(hand),
+                    score=1.0,
+                    display_name=HANDEDNESS_NAMES[hand],
+                    category_name=HANDEDNESS_NAMES[hand],
+                )
+            ]
+            for hand in handedness
+        ],
+        hand_landmarks=[
+            [NormalizedLandmark(x=x, y=y, z=z) for x, y, z in hand]
+            for hand in points.tolist()
+        ],
+        hand_world_landmarks=[],
+    )
+
+
+class ReplayLandmarker:
+    """Stands in for `EasyHandLandmarker`, replaying a recording instead of
+    running the model.
+
+    Each `process_frame` call moves on to the next recorded frame, so a demo
+    runs as fast as its loop allows. With `realtime` set, frames are instead
+    picked by the time elapsed since the first call, matching the original
+    pacing.
+    """
+
+    def __init__(self, path, realtime=False, loop=False, **_kwargs):
+        self.recording = LandmarkRecording(path)
+        self.realtime = realtime
+        self.loop = loop
+        self.sequence = 0
+        self.dropped_frames = 0
+        self.index = -1
+        self.start_time = None
+        self.latest = None
+        self.last_returned_sequence = -1
+
+    def _next_index(self, now):
+        if not self.realtime:
+            return self.index + 1
+
+        if self.start_time is None:
+            self.start_time = now
+        timestamps = self.recording.timestamps
+        target_ms = timestamps[0] + (now - self.start_time) * 1000
+        if target_ms > timestamps[-1] and self.index == len(self.recording) - 1:
+            return len(self.recording)
+        return int(np.searchsorted(timestamps, target_ms, "right")) - 1
+
+    def process_frame(self, _frame=None, capture_time=None):
+        if not len(self.recording):
+            return False
+
+        now = time.monotonic()
+        index = self._next_index(now)
+        if index >= len(self.recording):
+            if not self.loop:
+                return False
+            index = 0
+            self.start_time = now
+        if index == self.index:
+            return False
+
+        self.index = index
+        self.sequence += 1
+        _, points, handedness = self.recording.frame(index)
+        capture_time = now if capture_time is None else capture_time
+        self.latest = FrameResult(
+            points_to_result(points, handedness),
+            self.sequence,
+            capture_time,
+            capture_time,
+            capture_time,
+        )
+        self.latest.points = points
+        return True
+
+    def get_latest_result(self) -> FrameResult | None:
+        if self.latest is not None:
+            self.last_returned_sequence = self.latest.sequence
+        return self.latest
+
+    def peek_result(self) -> FrameResult | None:
+        return self.latest
+
+    def wait_for_result(self, timeout=None) -> FrameResult | None:
+        # results are produced synchronously, so there is nothing to wait for
+        if self.latest is None or self.latest.sequence <= self.last_returned_sequence:
+            return None
+        return self.get_latest_result()
+
+    def close(self):
+        self.latest = None
+        self.recording.close()
@@ -0,0 +1,180 @@
+"""
+One capture and one landmarker shared by any number of gesture apps.
+
+    python -m common.runtime slider music
+
+runs the slider and the music controls side by side off a single camera,
+with inference done once per frame however many apps are running. Any script
+that defines a `create_app` function can be named, and the usual flags (see
+common/options.py) can be passed along.
+"""
+
+import importlib
+import time
+
+import numpy as np
+
+from common import profiling
+from common.capture import open_capture
+from common.dispatch import get_dispatcher
+from common.display import close_window, poll_key, show, start_headless_input
+from common.hands import (
+    draw_landmarks,
+    handedness_to_array,
+    landmarks_to_array,
+    open_landmarker,
+)
+from common.metrics import get_monitor
+from common.options import get_options, parser
+from common.tracking import get_hand_tracker
+
+NO_HANDS = np.empty((0, 21, 3), dtype=np.float32)
+
+
+class GestureApp:
+    """An interaction run by a `Runtime`. Subclasses override the hooks they
+    need.
+
+    Each frame, `update` gets the landmarks of the latest result as a
+    (hands, 21, 3) array (see `landmarks_to_array`) of at most `num_hands`
+    hands, longest tracked first, whose IDs are the first `len(points)` of
+    `get_hand_tracker().ids` (see common/tracking.py). After that every app's
+    `render` draws on the frame and `handle_key` sees the key that was
+    pressed.
+    """
+
+    num_hands = 2
+
+    def update(self, frame, points):
+        pass
+
+    def render(self, frame):
+        pass
+
+    def handle_key(self, key):
+        pass
+
+    def close(self):
+        pass
+
+
+class Runtime:
+    """Runs apps off a shared capture and landmarker, both opened from the
+    command line. The landmarker tracks as many hands as the hungriest app
+    passed in at construction needs.
+
+    How long startup took, from `start_time` (a `time.monotonic` value,
+    defaulting to when the runtime is created) to the landmarker and camera
+    being ready, the first frame and the first result, is printed once the
+    first result arrives and kept in `startup`.
+
+    When `headless` (which defaults to --headless), nothing is drawn or shown,
+    and keys come from stdin and signals instead (see common/display.py).
+    """
+
+    def __init__(self, apps=(), draw_hands=True, start_time=None, headless=None):
+        self.start_time = time.monotonic() if start_time is None else start_time
+        self.startup = get_monitor().startup
+        self.apps = list(apps)
+        self.draw_hands = draw_hands
+        self.headless = get_options().headless if headless is None else headless
+        if self.headless:
+            start_headless_input()
+        self.landmarker = open_landmarker(
+            num_hands=max((app.num_hands for app in self.apps), default=2)
+        )
+        self._mark_startup("landmarker")
+        self.cap = open_capture()
+        self._mark_startup("capture")
+
+    def _mark_startup(self, step):
+        if step not in self.startup:
+            self.startup[step] = time.monotonic() - self.start_time
+
+    def add(self, app):
+        self.apps.append(app)
+
+    def remove(self, app):
+        self.apps.remove(app)
+        app.close()
+
+    def step(self):
+        """Runs one frame through every app. Returns False when the input has
+        run out or 'q' was pressed."""
+        get_dispatcher().poll()
+        ret, frame = self.cap.read()
+        if not ret:
+            return False
+        self._mark_startup("first_frame")
+
+        self.landmarker.process_frame(frame, self.cap.frame_time)
+        result = self.landmarker.get_latest_result()
+        points = NO_HANDS
+        if result:
+            if "first_result" not in self.startup:
+                self._mark_startup("first_result")
+                print(
+                    "startup: "
+                    + ", ".join(f"{k} {v:.2f}s" for k, v in self.startup.items())
+                )
+            points = get_hand_tracker().update(
+                landmarks_to_array(result),
+                handedness_to_array(result),
+                result.capture_time,
+            )
+            if self.draw_hands and not self.headless:
+                draw_landmarks(frame, result)
+
+        # apps wanting the same hands get the same array, so they share its
+        # features (see common/gestures.py)
+        hands = {len(points): points}
+        with profiling.span("gesture"):
+            for app in self.apps:
+                count = min(app.num_hands, len(points))
+                if count not in hands:
+                    hands[count] = points[:count]
+                app.update(frame, hands[count])
+
+        if self.headless:
+            get_monitor().observe_result(result)
+            key = poll_key()
+        else:
+            with profiling.span("render"):
+                for app in self.apps:
+                    app.render(frame)
+            key = show(frame)
+        for app in self.apps:
+            app.handle_key(key)
+        return key != ord("q")
+
+    def run(self):
+        try:
+            while self.cap.isOpened() and self.step():
+                pass
+        finally:
+            self.close()
+
+    def close(self):
+        for app in self.apps:
+            app.close()
+        # let actions the apps fired on their way out finish
+        dispatcher = get_dispatcher()
+        dispatcher.flush(dispatcher.timeout)
+        self.cap.release()
+        exporter = get_monitor().exporter
+        if exporter is not None:
+            exporter.close()
+        if not self.headless:
+            close_window()
+        self.landmarker.close()
+
+
+def load_app(name):
+    """Creates the app defined by the script `name` (e.g. "slider")."""
+    return importlib.import_module(name).create_app()
+
+
+if __name__ == "__main__":
+    # anything the shared options don't recognise is an app name
+    _, names = parser.parse_known_args()
+    Runtime([load_app(name) for name in names]).run()
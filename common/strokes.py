@@ -0,0 +1,330 @@
+"""
+Drawn strokes, kept small and saved as they're drawn.
+
+A `Stroke` stores its points as int16 pixels and simplifies them as they
+arrive: while every point since the last kept one stays within `tolerance`
+pixels of the segment from it to the newest point, the newest point replaces
+the one before it. A straight or gently curving stretch ends up as a couple of
+points, so a stroke's size follows how complicated it looks rather than how
+long it took to draw.
+
+`StrokeAutosaver` saves strokes from a background thread, to an SVG and to a
+binary journal that `load_strokes` reads back. The journal is a little-endian
+file of records, each appended as it happens:
+
+    header   MAGIC, then the uint32 VERSION
+    record   RECORD: kind, stroke ID and point count, then int16[count, 2]
+             points for an ADD; REMOVE and CLEAR have no points
+
+It's rewritten from scratch when most of it describes strokes that have since
+been removed, so it stays about as big as the drawing.
+"""
+
+import argparse
+import os
+import struct
+import sys
+import threading
+from pathlib import Path
+
+import numpy as np
+
+MAGIC = b"HWST"
+VERSION = 1
+RECORD = struct.Struct("<BII")
+ADD = 1
+REMOVE = 2
+CLEAR = 3
+
+TOLERANCE = 1.5
+# most points held back while waiting to see where a stretch ends
+MAX_PENDING = 64
+AUTOSAVE_SECONDS = 5.0
+
+
+class Stroke:
+    def __init__(self, stroke_id, points=None, tolerance=TOLERANCE):
+        self.id = stroke_id
+        self.tolerance = tolerance
+        if points is None:
+            self.buffer = np.empty((16, 2), dtype=np.int16)
+            self.length = 0
+        else:
+            self.buffer = np.array(points, dtype=np.int16).reshape(-1, 2)
+            self.length = len(self.buffer)
+        # the points since the last kept one, which the last point must stay
+        # close to
+        self.pending = []
+
+    def __len__(self):
+        return self.length
+
+    @property
+    def points(self):
+        """The simplified points, as an (n, 2) int16 array."""
+        return self.buffer[: self.length]
+
+    @property
+    def last(self):
+        """The last point added, before simplification."""
+        if self.pending:
+            return self.pending[-1]
+        return tuple(self.points[-1]) if self.length else None
+
+    def _append(self, point):
+        if self.length == len(self.buffer):
+            self.buffer = np.resize(self.buffer, (2 * len(self.buffer), 2))
+        self.buffer[self.length] = point
+        self.length += 1
+
+    def add(self, point):
+        if self.length < 2:
+            self._append(point)
+            if self.length == 2:
+                self.pending.append(point)
+            return
+
+        self.pending.append(point)
+        anchor = self.buffer[self.length - 2].astype(np.float64)
+        if len(self.pending) <= MAX_PENDING and self._fits(anchor, point):
+            # the newest point stands in for the last one
+            self.buffer[self.length - 1] = point
+        else:
+            # the last point stays, and a new stretch starts from it
+            self.pending = self.pending[-1:]
+            self._append(point)
+
+    def distance(self, point):
+        """How far `point` is from the nearest part of the stroke."""
+        points = self.points.astype(np.float64)
+        point = np.asarray(point, dtype=np.float64)
+        if len(points) < 2:
+            return np.hypot(*(points[0] - point)) if len(points) else np.inf
+        starts, segments = points[:-1], np.diff(points, axis=0)
+        lengths = np.maximum(np.sum(segments**2, axis=1), 1e-9)
+        along = np.clip(np.sum((point - starts) * segments, axis=1) / lengths, 0, 1)
+        nearest = starts + along[:, None] * segments
+        return np.min(np.hypot(*(nearest - point).T))
+
+    def _fits(self, anchor, end):
+        # the largest distance from a pending point to the anchor-end segment
+        # (not the whole line through them, or a stroke that doubles back
+        # would lose the end it turned at)
+        pending = np.array(self.pending, dtype=np.float64) - anchor
+        direction = np.asarray(end, dtype=np.float64) - anchor
+        length = max(direction @ direction, 1e-9)
+        along = np.clip(pending @ direction / length, 0, 1)
+        offsets = pending - along[:, None] * direction
+        distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        return distances.max() <= self.tolerance
+
+
+def write_svg(path, strokes, size, colour=(0, 0, 255), thickness=5):
+    """Writes `strokes` (lists of points) to an SVG of `size` (width, height)
+    pixels. `colour` is BGR, like OpenCV's."""
+    width, height = size
+    blue, green, red = colour
+    lines = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" '
+        f'height="{height}" viewBox="0 0 {width} {height}">',
+        f'<g fill="none" stroke="rgb({red},{green},{blue})" '
+        f'stroke-width="{thickness}" stroke-linecap="round" '
+        'stroke-linejoin="round">',
+    ]
+    for points in strokes:
+        if len(points) > 1:
+            coordinates = " ".join(f"{x},{y}" for x, y in points)
+            lines.append(f'<polyline points="{coordinates}"/>')
+    lines += ["</g>", "</svg>", ""]
+    _replace(path, "\n".join(lines).encode())
+
+
+def _replace(path, data):
+    # a crash halfway through leaves the old file
+    temporary = Path(f"{path}.tmp")
+    temporary.write_bytes(data)
+    os.replace(temporary, path)
+
+
+def _add_record(stroke_id, points):
+    points = np.ascontiguousarray(points, dtype="<i2")
+    return RECORD.pack(ADD, stroke_id, len(points)) + points.tobytes()
+
+
+def load_strokes(path):
+    """Replays a journal, returning {stroke ID: int16 points} for the strokes
+    still there at the end. A record cut off by a crash is ignored."""
+    data = Path(path).read_bytes()
+    if data[:4] != MAGIC or struct.unpack_from("<I", data, 4)[0] != VERSION:
+        raise ValueError(f"{path} isn't a stroke journal")
+
+    strokes = {}
+    offset = 8
+    while offset + RECORD.size <= len(data):
+        kind, stroke_id, count = RECORD.unpack_from(data, offset)
+        offset += RECORD.size
+        if kind == ADD:
+            if offset + count * 4 > len(data):
+                break
+            points = np.frombuffer(data, "<i2", count * 2, offset)
+            strokes[stroke_id] = points.reshape(-1, 2).astype(np.int16)
+            offset += count * 4
+        elif kind == REMOVE:
+            strokes.pop(stroke_id, None)
+        elif kind == CLEAR:
+            strokes.clear()
+        else:
+            raise ValueError(f"unknown record {kind} in {path}")
+    return strokes
+
+
+class StrokeAutosaver:
+    """Saves finished strokes to `path` (a journal) and the same path with
+    an .svg suffix, at most every `interval` seconds, from a thread. The
+    strokes are kept in `strokes` ({ID: points}) for writing the SVG, starting
+    with those already saved in the journal. `size` is the SVG's size, which
+    can be set once the frame's is known."""
+
+    def __init__(
+        self,
+        path,
+        size=(0, 0),
+        colour=(0, 0, 255),
+        thickness=5,
+        interval=AUTOSAVE_SECONDS,
+    ):
+        self.path = Path(path)
+        self.svg_path = self.path.with_suffix(".svg")
+        self.size = size
+        self.colour = colour
+        self.thickness = thickness
+        self.interval = interval
+        self.strokes = load_strokes(self.path) if self.path.exists() else {}
+        # bytes of the journal that describe removed strokes
+        self.dead_bytes = 0
+        self.records = []
+        self.condition = threading.Condition()
+        self.closed = False
+        self.saves = 0
+        # start from a journal with nothing dead (or cut off) in it
+        self._write_journal(self.strokes)
+        self.thread = threading.Thread(
+            target=self._save_changes, name="autosave", daemon=True
+        )
+        self.thread.start()
+
+    def added(self, stroke_id, points):
+        with self.condition:
+            self.strokes[stroke_id] = np.array(points, dtype=np.int16)
+            self.records.append(_add_record(stroke_id, points))
+            self.condition.notify()
+
+    def removed(self, stroke_id):
+        with self.condition:
+            points = self.strokes.pop(stroke_id, None)
+            if points is not None:
+                self.dead_bytes += RECORD.size + points.nbytes
+            self.records.append(RECORD.pack(REMOVE, stroke_id, 0))
+            self.condition.notify()
+
+    def cleared(self):
+        with self.condition:
+            self.dead_bytes += sum(
+                RECORD.size + points.nbytes for points in self.strokes.values()
+            )
+            self.strokes.clear()
+            self.records.append(RECORD.pack(CLEAR, 0, 0))
+            self.condition.notify()
+
+    def _save_changes(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.records or self.closed)
+                if not self.records:
+                    return
+                # changes made in the meantime go in the same save
+                self.condition.wait_for(lambda: self.closed, self.interval)
+                records, self.records = self.records, []
+                strokes = dict(self.strokes)
+                live_bytes = sum(
+                    RECORD.size + points.nbytes for points in strokes.values()
+                )
+                compact = self.dead_bytes > live_bytes
+                if compact:
+                    self.dead_bytes = 0
+                closed = self.closed
+
+            if compact:
+                self._write_journal(strokes)
+            else:
+                with open(self.path, "ab") as file:
+                    file.write(b"".join(records))
+            write_svg(
+                self.svg_path, strokes.values(), self.size, self.colour, self.thickness
+            )
+            self.saves += 1
+            if closed:
+                return
+
+    def _write_journal(self, strokes):
+        header = MAGIC + struct.pack("<I", VERSION)
+        _replace(
+            self.path,
+            header
+            + b"".join(
+                _add_record(stroke_id, points) for stroke_id, points in strokes.items()
+            ),
+        )
+
+    def close(self):
+        """Saves what's left and stops the thread."""
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        self.thread.join()
+
+
+def _simplification_error(points, tolerance=TOLERANCE):
+    # how far the furthest drawn point is from the simplified stroke
+    stroke = Stroke(0, tolerance=tolerance)
+    for point in points:
+        stroke.add(point)
+    return len(stroke), max(stroke.distance(point) for point in points)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m common.strokes",
+        description="Draws strokes and checks every point stays within the "
+        "tolerance of the simplified stroke.",
+    )
+    parser.add_argument("--curves", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    # out to x=187 and back along the same line: the turn must be kept
+    out = [(100 + x, 100 if x < 60 else 101) for x in range(88)]
+    back = [(187 - x, 101) for x in range(58)]
+    kept, error = _simplification_error(out + back)
+    print(f"doubling back: {kept} points kept, {error:.2f} px off")
+    worst = error
+
+    rng = np.random.default_rng(args.seed)
+    errors = []
+    for _ in range(args.curves):
+        # a random walk with some drift, like a hand wandering about
+        drift = rng.normal(0, 4, 2) * np.arange(200)[:, None] / 10
+        walk = rng.normal(0, 3, (200, 2)).cumsum(axis=0) + drift + 1000
+        points = [(int(x), int(y)) for x, y in walk.round()]
+        errors.append(_simplification_error(points)[1])
+    print(f"{args.curves} random curves: at most {max(errors):.2f} px off")
+    worst = max(worst, *errors)
+
+    if worst > TOLERANCE:
+        print(f"FAILED: more than the tolerance of {TOLERANCE} px")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+"""
+A minimal client for sway's IPC socket, for running commands without
+spawning `swaymsg`.
+
+    get_sway().command("workspace next")
+
+sends the command over a connection to $SWAYSOCK that is kept open between
+calls, and reopened if sway restarts or the connection drops. Several
+commands passed together go in one message, run in order.
+
+Messages are framed as in i3's IPC protocol: the magic string "i3-ipc", the
+payload length and the message type as native-endian 32-bit integers, and
+the payload. A RUN_COMMAND reply is a JSON list with a {"success": ...}
+object per command.
+
+`FakeSwayServer` answers on a socket of its own, so the client (and
+actions.py) can be tried without sway.
+"""
+
+import functools
+import json
+import os
+import socket
+import struct
+import threading
+
+MAGIC = b"i3-ipc"
+HEADER = struct.Struct("=6sII")
+RUN_COMMAND = 0
+
+
+class SwayError(Exception):
+    pass
+
+
+def _receive_exactly(sock, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("connection closed")
+        data += chunk
+    return bytes(data)
+
+
+def _send_message(sock, message_type, payload):
+    sock.sendall(HEADER.pack(MAGIC, len(payload), message_type) + payload)
+
+
+def _receive_message(sock):
+    magic, length, message_type = HEADER.unpack(_receive_exactly(sock, HEADER.size))
+    if magic != MAGIC:
+        raise SwayError(f"unexpected reply from sway: {magic!r}")
+    return message_type, _receive_exactly(sock, length)
+
+
+class SwayClient:
+    def __init__(self, socket_path=None, timeout=1.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.sock = None
+        # commands may come from several dispatcher threads
+        self.lock = threading.Lock()
+
+    def _connect(self):
+        path = self.socket_path or os.environ.get("SWAYSOCK")
+        if not path:
+            raise SwayError("SWAYSOCK isn't set; is sway running?")
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(path)
+        except OSError:
+            sock.close()
+            raise
+        self.sock = sock
+
+    def _request(self, message_type, payload):
+        if self.sock is None:
+            self._connect()
+        _send_message(self.sock, message_type, payload)
+        reply_type, reply = _receive_message(self.sock)
+        if reply_type != message_type:
+            raise SwayError(
+                f"expected a reply of type {message_type}, got {reply_type}"
+            )
+        return json.loads(reply)
+
+    def command(self, *commands):
+        """Runs sway commands (e.g. "workspace 3") in one message. Raises
+        `SwayError` if any of them fail."""
+        payload = "; ".join(commands).encode()
+        with self.lock:
+            try:
+                results = self._request(RUN_COMMAND, payload)
+            except TimeoutError:
+                # sway may still run it, so don't send it again
+                self.close()
+                raise
+            except OSError:
+                # a stale connection, e.g. from before sway restarted; one
+                # retry on a fresh one
+                self.close()
+                try:
+                    results = self._request(RUN_COMMAND, payload)
+                except OSError:
+                    self.close()
+                    raise
+
+        errors = [
+            result.get("error", "failed")
+            for result in results
+            if not result.get("success")
+        ]
+        if errors:
+            raise SwayError(", ".join(errors))
+        return results
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+
+class FakeSwayServer:
+    """Listens on `socket_path` and answers RUN_COMMAND messages like sway,
+    recording every command in `commands`. Commands in `failing` get an
+    error reply."""
+
+    def __init__(self, socket_path):
+        self.socket_path = socket_path
+        self.commands = []
+        self.failing = set()
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(socket_path)
+        self.server.listen()
+        self.connections = []
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+        self.thread.start()
+
+    def _serve(self):
+        while True:
+            try:
+                connection, _ = self.server.accept()
+            except OSError:
+                return
+            self.connections.append(connection)
+            threading.Thread(
+                target=self._handle, args=(connection,), daemon=True
+            ).start()
+
+    def _handle(self, connection):
+        with connection:
+            while True:
+                try:
+                    message_type, payload = _receive_message(connection)
+                except (OSError, SwayError):
+                    return
+                results = []
+                for command in payload.decode().split(";"):
+                    command = command.strip()
+                    self.commands.append(command)
+                    if command in self.failing:
+                        results.append({"success": False, "error": "failed"})
+                    else:
+                        results.append({"success": True})
+                try:
+                    _send_message(
+                        connection, message_type, json.dumps(results).encode()
+                    )
+                except OSError:
+                    return
+
+    def drop_connections(self):
+        """Closes every open connection, as if sway had restarted."""
+        for connection in self.connections:
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self.connections.clear()
+
+    def close(self):
+        self.drop_connections()
+        self.server.close()
+        os.unlink(self.socket_path)
+
+
+@functools.cache
+def get_sway():
+    """Returns a shared `SwayClient` for $SWAYSOCK."""
+    return SwayClient()
@@ -0,0 +1,129 @@
+"""
+Chrome trace-event export of the profiling spans.
+
+    python draw.py --trace draw.json
+
+records every span (see common/profiling.py) from every thread into a file
+that can be opened in Perfetto (ui.perfetto.dev) or chrome://tracing. Each
+span is tagged with the main-loop frame it belongs to, and a span with a
+`flow_start` argument is joined by an arrow to the span with the same
+`flow_end`, which is how each submission is tied to the callback that delivers
+its result, to show where frames queue up.
+
+Events are written as they come in, in the JSON array format, which the
+viewers accept even if the process dies before the file is closed.
+"""
+
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+
+from common import profiling
+from common.options import get_options
+
+# flush to disk after this many events
+BUFFER_SIZE = 1000
+# span arguments that start and end a flow arrow, and their event phases
+FLOW_PHASES = {"flow_start": {"ph": "s"}, "flow_end": {"ph": "f", "bp": "e"}}
+
+
+class ChromeTracer:
+    def __init__(self, path):
+        self.file = open(path, "w")
+        self.file.write("[\n")
+        self.lock = threading.Lock()
+        self.start = time.perf_counter()
+        self.pid = os.getpid()
+        self.thread_ids = {}
+        self.buffer = []
+        self.events_written = 0
+
+    def _microseconds(self, seconds):
+        return round((seconds - self.start) * 1e6, 3)
+
+    def _thread_id(self, thread):
+        thread_id = self.thread_ids.get(thread)
+        if thread_id is None:
+            thread_id = self.thread_ids[thread] = len(self.thread_ids) + 1
+            self.buffer.append(
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": self.pid,
+                    "tid": thread_id,
+                    "args": {"name": thread},
+                }
+            )
+        return thread_id
+
+    def __call__(self, span):
+        args = {"frame": span.frame, **span.args}
+        with self.lock:
+            if self.file.closed:
+                return
+            tid = self._thread_id(span.thread)
+            self.buffer.append(
+                {
+                    "name": span.name,
+                    "cat": span.name,
+                    "ph": "X",
+                    "ts": self._microseconds(span.start),
+                    "dur": round(span.duration * 1e6, 3),
+                    "pid": self.pid,
+                    "tid": tid,
+                    "args": args,
+                }
+            )
+
+            for key, phase in FLOW_PHASES.items():
+                if key not in span.args:
+                    continue
+                self.buffer.append(
+                    {
+                        "name": "result",
+                        "cat": "flow",
+                        "id": span.args[key],
+                        # mid-span, so the arrow binds to this span
+                        "ts": self._microseconds(span.start + span.duration / 2),
+                        "pid": self.pid,
+                        "tid": tid,
+                        **phase,
+                    }
+                )
+
+            if len(self.buffer) >= BUFFER_SIZE:
+                self._flush()
+
+    def _flush(self):
+        for event in self.buffer:
+            if self.events_written:
+                self.file.write(",\n")
+            self.file.write(json.dumps(event, separators=(",", ":")))
+            self.events_written += 1
+        self.buffer.clear()
+        self.file.flush()
+
+    def close(self):
+        with self.lock:
+            if self.file.closed:
+                return
+            self._flush()
+            self.file.write("\n]\n")
+            self.file.close()
+
+
+@functools.cache
+def get_tracer():
+    """Starts tracing to the --trace file, if one was given. The trace is
+    finished when the process exits."""
+    options = get_options()
+    if not options.trace:
+        return None
+
+    tracer = ChromeTracer(options.trace)
+    profiling.add_sink(tracer)
+    atexit.register(tracer.close)
+    return tracer
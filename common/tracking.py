@@ -0,0 +1,140 @@
+"""
+Persistent hand identities across frames.
+
+MediaPipe returns hands in no particular order, so the first hand in one
+result can be the second in the next. `HandTracker` gives every hand an ID
+that sticks to it for as long as it stays in view, by matching each hand's
+palm to where each known hand's palm should be by now, and preferring hands
+of the same handedness. A hand that drops out of a few results (a missed
+detection, or a quick pass behind something) gets its old ID back if it turns
+up again within `max_gap` seconds, near where it was heading.
+
+The runtime keeps one tracker (see `get_hand_tracker`) and hands apps their
+landmarks in track order, oldest first, so `get_hand_tracker().ids` says which
+hand each row of `points` is.
+"""
+
+import functools
+import itertools
+
+import numpy as np
+
+from common.hands import HandLandmark
+
+# wrist and knuckles, which move together and don't move with the fingers
+PALM = [
+    HandLandmark.WRIST,
+    HandLandmark.INDEX_FINGER_MCP,
+    HandLandmark.MIDDLE_FINGER_MCP,
+    HandLandmark.RING_FINGER_MCP,
+    HandLandmark.PINKY_MCP,
+]
+NO_IDS = np.empty(0, dtype=np.int64)
+# handedness of a hand that wasn't classified
+UNKNOWN = 255
+
+
+class HandTracker:
+    """Assigns persistent IDs to hands, for any number of hands.
+
+    Each `update`, hands are assigned to tracks greedily, closest first, by
+    the distance between palms (normalized coordinates) plus
+    `handedness_penalty` if the handedness disagrees. Pairs further apart than
+    `max_distance` are never matched; a hand left over starts a new track.
+    """
+
+    def __init__(self, max_distance=0.15, handedness_penalty=0.1, max_gap=0.5):
+        self.max_distance = max_distance
+        self.handedness_penalty = handedness_penalty
+        self.max_gap = max_gap
+        self.next_ids = itertools.count()
+        # per track, in the same order
+        self.track_ids = NO_IDS
+        self.palms = np.empty((0, 2))
+        self.velocities = np.empty((0, 2))
+        self.track_handedness = np.empty(0, dtype=np.uint8)
+        self.last_seen = np.empty(0)
+        # the IDs of the hands returned by the last update, and of tracks that
+        # ended in it
+        self.ids = NO_IDS
+        self.lost = set()
+        # capture time of the result the last update was given
+        self.time = None
+
+    def update(self, points, handedness=None, now=0.0):
+        """Takes the (hands, 21, 3) landmarks of a result captured at `now`
+        (seconds), and the handedness (0 left, 1 right) of each hand if known.
+        Returns the landmarks sorted
+        by track, oldest first, and sets `ids` to match."""
+        self.time = now
+        palms = points[:, PALM, :2].mean(axis=1).astype(np.float64)
+        if handedness is None:
+            handedness = np.full(len(points), UNKNOWN, dtype=np.uint8)
+
+        # where every known hand should be by now
+        gaps = now - self.last_seen
+        expected = self.palms + self.velocities * gaps[:, None]
+        cost = np.linalg.norm(palms[:, None] - expected[None], axis=-1)
+        known = (handedness[:, None] != UNKNOWN) & (
+            self.track_handedness[None] != UNKNOWN
+        )
+        cost += self.handedness_penalty * (
+            known & (handedness[:, None] != self.track_handedness[None])
+        )
+
+        track_of_hand = np.full(len(points), -1)
+        hand_of_track = np.full(len(self.track_ids), -1)
+        for flat in np.argsort(cost, axis=None):
+            hand, track = divmod(int(flat), len(self.track_ids))
+            if cost[hand, track] > self.max_distance:
+                break
+            if track_of_hand[hand] < 0 and hand_of_track[track] < 0:
+                track_of_hand[hand] = track
+                hand_of_track[track] = hand
+
+        # matched tracks move on, the rest are kept until their gap runs out
+        matched = hand_of_track >= 0
+        hands = hand_of_track[matched]
+        # a result seen again (e.g. while inference catches up) says nothing
+        # about speed
+        dt = gaps[matched, None]
+        moved = (palms[hands] - self.palms[matched]) / np.where(dt > 0, dt, 1)
+        self.velocities[matched] = np.where(
+            dt > 0, (self.velocities[matched] + moved) / 2, self.velocities[matched]
+        )
+        self.palms[matched] = palms[hands]
+        self.track_handedness[matched] = handedness[hands]
+        self.last_seen[matched] = now
+
+        new = track_of_hand < 0
+        ids = np.empty(len(points), dtype=np.int64)
+        ids[~new] = self.track_ids[track_of_hand[~new]]
+        new_ids = np.array(
+            [next(self.next_ids) for _ in range(new.sum())], dtype=np.int64
+        )
+        ids[new] = new_ids
+
+        keep = matched | (gaps <= self.max_gap)
+        self.lost = set(self.track_ids[~keep].tolist())
+        self.track_ids = np.concatenate([self.track_ids[keep], new_ids])
+        self.palms = np.concatenate([self.palms[keep], palms[new]])
+        self.velocities = np.concatenate(
+            [self.velocities[keep], np.zeros((len(new_ids), 2))]
+        )
+        self.track_handedness = np.concatenate(
+            [self.track_handedness[keep], handedness[new]]
+        )
+        self.last_seen = np.concatenate(
+            [self.last_seen[keep], np.full(len(new_ids), now)]
+        )
+
+        # IDs only go up, so this is oldest first
+        order = np.argsort(ids)
+        self.ids = ids[order]
+        return points[order]
+
+
+@functools.cache
+def get_hand_tracker():
+    """Returns the tracker the runtime updates every frame."""
+    return HandTracker()
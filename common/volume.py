@@ -1,20 +1,211 @@
+"""
+The system volume, cached and written in the background.
+
+`get_volume` returns the cached volume (in percent) without running anything,
+and `set_volume` returns straight away. A writer thread sends only the latest
+value asked for, at most `MAX_WRITE_RATE` times a second, however often it's
+called while dragging. Changes made elsewhere (media keys, a mixer) update the
+cache when the backend can watch for them.
+
+The backend is picked with --volume-backend:
+
+- pulse: `pactl`, which works with PulseAudio and PipeWire's pulse server,
+  and watches for changes with `pactl subscribe`
+- wpctl: PipeWire's `wpctl`, which can't watch for changes
+- fake: an in-memory volume, for tests and benchmarks
+
+The default is pulse if `pactl` is installed, and wpctl otherwise.
+"""
+
+import functools
+import math
+import re
+import shutil
 import subprocess
+import sys
+import threading
+import time
 
+from common.options import get_options
 
-def set_volume(value):
-    subprocess.run(["wpctl", "set-volume", "@DEFAULT_SINK@", str(value) + "%"])
+MAX_WRITE_RATE = 20
+# how long after a write to ignore reported changes, which are most likely the
+# write itself landing
+SETTLE_SECONDS = 0.5
+# how long change events must stop for before the volume is read again
+WATCH_DEBOUNCE_SECONDS = 0.1
 
 
-def get_volume():
-    return int(
-        float(
-            subprocess.run(
-                ["wpctl", "get-volume", "@DEFAULT_SINK@"],
-                capture_output=True,
-                text=True,
-            )
-            .stdout.strip("\n")
-            .split()[1]
+class PulseBackend:
+    def read(self):
+        output = subprocess.run(
+            ["pactl", "get-sink-volume", "@DEFAULT_SINK@"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        # the first channel's "NNN%"
+        return int(re.search(r"(\d+)%", output).group(1))
+
+    def write(self, volume):
+        subprocess.run(
+            ["pactl", "set-sink-volume", "@DEFAULT_SINK@", f"{round(volume)}%"],
+            check=True,
         )
-        * 100
-    )
+
+    def watch(self, callback):
+        """Calls `callback` with the new volume whenever the default sink
+        changes, from a thread of its own."""
+        threading.Thread(
+            target=self._watch, args=(callback,), name="volume-watch", daemon=True
+        ).start()
+
+    def _watch(self, callback):
+        changed = threading.Event()
+
+        def read_when_quiet():
+            while True:
+                changed.wait()
+                # a volume drag fires a burst of events
+                while changed.wait(WATCH_DEBOUNCE_SECONDS):
+                    changed.clear()
+                try:
+                    callback(self.read())
+                except (OSError, subprocess.SubprocessError) as e:
+                    print(f"couldn't read the volume: {e}", file=sys.stderr)
+
+        threading.Thread(target=read_when_quiet, daemon=True).start()
+        while True:
+            try:
+                with subprocess.Popen(
+                    ["pactl", "subscribe"], stdout=subprocess.PIPE, text=True
+                ) as process:
+                    for line in process.stdout:
+                        # "Event 'change' on sink #56", or "on server" when the
+                        # default sink changes
+                        if "'change'" in line and (
+                            "sink #" in line or "server" in line
+                        ):
+                            changed.set()
+            except OSError as e:
+                print(f"couldn't watch the volume: {e}", file=sys.stderr)
+                return
+            # the sound server went away; try again once it's back
+            time.sleep(1)
+
+
+class WpctlBackend:
+    def read(self):
+        output = subprocess.run(
+            ["wpctl", "get-volume", "@DEFAULT_SINK@"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        # "Volume: 0.50", with " [MUTED]" after it when muted
+        return round(float(output.split()[1]) * 100)
+
+    def write(self, volume):
+        subprocess.run(
+            ["wpctl", "set-volume", "@DEFAULT_SINK@", f"{volume}%"], check=True
+        )
+
+    def watch(self, callback):
+        pass
+
+
+class FakeVolumeBackend:
+    """An in-memory volume. `writes` keeps every value written, and
+    `change` simulates the volume being changed by something else."""
+
+    def __init__(self, volume=50):
+        self.volume = volume
+        self.writes = []
+        self.callbacks = []
+
+    def read(self):
+        return self.volume
+
+    def write(self, volume):
+        self.volume = volume
+        self.writes.append(volume)
+
+    def watch(self, callback):
+        self.callbacks.append(callback)
+
+    def change(self, volume):
+        self.volume = volume
+        for callback in self.callbacks:
+            callback(volume)
+
+
+BACKENDS = {
+    "pulse": PulseBackend,
+    "wpctl": WpctlBackend,
+    "fake": FakeVolumeBackend,
+}
+
+
+class VolumeControl:
+    """Caches a backend's volume and writes changes to it from a thread, at
+    most `max_rate` times a second, always the latest value."""
+
+    def __init__(self, backend, max_rate=MAX_WRITE_RATE):
+        self.backend = backend
+        self.interval = 1 / max_rate
+        self.volume = backend.read()
+        self.condition = threading.Condition()
+        # the value waiting to be written, if any
+        self.requested = None
+        self.last_write = -math.inf
+        self.writes = 0
+        threading.Thread(target=self._write_changes, name="volume", daemon=True).start()
+        backend.watch(self._changed)
+
+    def get(self):
+        return self.volume
+
+    def set(self, volume):
+        with self.condition:
+            self.volume = self.requested = volume
+            self.condition.notify()
+
+    def _write_changes(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.requested is not None)
+            # values asked for in the meantime replace this one
+            time.sleep(max(0.0, self.last_write + self.interval - time.monotonic()))
+            with self.condition:
+                volume, self.requested = self.requested, None
+            try:
+                self.backend.write(volume)
+            except (OSError, subprocess.SubprocessError) as e:
+                print(f"couldn't set the volume: {e}", file=sys.stderr)
+            self.last_write = time.monotonic()
+            self.writes += 1
+
+    def _changed(self, volume):
+        with self.condition:
+            if (
+                self.requested is None
+                and time.monotonic() - self.last_write > SETTLE_SECONDS
+            ):
+                self.volume = volume
+
+
+@functools.cache
+def get_volume_control():
+    """Returns the process's `VolumeControl`, using the --volume-backend."""
+    name = get_options().volume_backend
+    if name is None:
+        name = "pulse" if shutil.which("pactl") else "wpctl"
+    return VolumeControl(BACKENDS[name]())
+
+
+def get_volume():
+    return get_volume_control().get()
+
+
+def set_volume(value):
+    get_volume_control().set(value)
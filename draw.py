@@ -4,71 +4,161 @@ DRAW
 
 Pinch your index finger and thumb together to start drawing, and move your hand to draw on the screen.
 
-Press 'r' to reset.
+Press 'u' to undo the last stroke, 'e' to switch between drawing and erasing (pinch a stroke to erase it), and 'r' to reset.
+
+Run with `--autosave FILE` to keep the drawing saved (see common/strokes.py) to FILE and an SVG next to it, and to pick up where it left off next time.
 """
 
+import itertools
+
 import cv2
 import mediapipe as mp
+import numpy as np
 
-from common.hands import (
-    EasyHandLandmarker,
-    draw_landmarks,
-    fraction_to_pixels,
-    get_pinch_pointer,
-    is_pinch,
-)
+from common.gestures import PINCH, PINCH_POINTER, get_features
+from common.hands import fraction_to_pixels
+from common.options import get_options
+from common.runtime import GestureApp, Runtime
+from common.strokes import Stroke, StrokeAutosaver
 
 mp_hands = mp.solutions.hands
 
-
-landmarker = EasyHandLandmarker(num_hands=1)
-
-# Initialize OpenCV
-cap = cv2.VideoCapture(2)  # Use 0 for the default camera
-was_drawing = False
-drawing = [[]]
-
-while cap.isOpened():
-    ret, frame = cap.read()
-    if not ret:
-        break
-
-    frame = cv2.flip(frame, 1)
-
-    # Process the frame with MediaPipe Hands
-    landmarker.process_frame(frame)
-    results = landmarker.get_latest_result()
-
-    if results:
-        draw_landmarks(frame, results)
-        for landmarks in results.hand_landmarks:
-            if is_pinch(landmarks):
-                was_drawing = True
-                pointer = get_pinch_pointer(landmarks)
-                pointer = fraction_to_pixels(frame, pointer[0], pointer[1])
-                drawing[-1].append((int(pointer[0]), int(pointer[1])))
-            elif was_drawing:
-                was_drawing = False
-                drawing.append([])
-
-    # draw the strokes
-    for stroke in drawing:
-        for i in range(1, len(stroke)):
-            x1, y1 = stroke[i - 1]
-            x2, y2 = stroke[i]
-            image = cv2.line(frame, (x1, y1), (x2, y2), (0, 0, 255), 5)
-
-    # Display the resulting frame
-    cv2.imshow("handiwork", frame)
-
-    # handle keyboard input
-    key = cv2.waitKey(1)
-    if key & 0xFF == ord("r"):
-        drawing = [[]]
-    if key & 0xFF == ord("q"):
-        break
-
-# Release the VideoCapture and close all windows
-cap.release()
-cv2.destroyAllWindows()
-landmarker.close()
+STROKE_COLOUR = (0, 0, 255)
+STROKE_THICKNESS = 5
+ERASER_RADIUS = 20
+
+
+class DrawApp(GestureApp):
+    num_hands = 1
+
+    def __init__(self, autosaver=None):
+        self.was_drawing = False
+        self.autosaver = autosaver
+        saved = {} if autosaver is None else autosaver.strokes
+        self.stroke_ids = itertools.count(max(saved, default=-1) + 1)
+        self.drawing = [
+            Stroke(stroke_id, points) for stroke_id, points in saved.items()
+        ]
+        self.drawing.append(self.new_stroke())
+        self.erasing = False
+        self.eraser = None
+        # the strokes drawn so far, each segment drawn once as it's added, and
+        # where they've been drawn
+        self.canvas = None
+        self.mask = None
+
+    def new_stroke(self):
+        return Stroke(next(self.stroke_ids))
+
+    def finish_stroke(self):
+        self.was_drawing = False
+        stroke = self.drawing[-1]
+        if stroke:
+            if self.autosaver is not None:
+                self.autosaver.added(stroke.id, stroke.points)
+            self.drawing.append(self.new_stroke())
+
+    def remove_strokes(self, removed):
+        if self.autosaver is not None:
+            for stroke in removed:
+                self.autosaver.removed(stroke.id)
+        self.drawing = [stroke for stroke in self.drawing if stroke not in removed]
+        if not self.drawing or self.drawing[-1]:
+            self.drawing.append(self.new_stroke())
+        self.redraw()
+
+    def draw_segment(self, start, end):
+        cv2.line(self.canvas, start, end, STROKE_COLOUR, STROKE_THICKNESS)
+        cv2.line(self.mask, start, end, 255, STROKE_THICKNESS)
+
+    def redraw(self):
+        """Draws the canvas from scratch, after strokes were removed."""
+        if self.canvas is None:
+            return
+        self.canvas[:] = 0
+        self.mask[:] = 0
+        strokes = [stroke.points.astype(np.int32) for stroke in self.drawing if stroke]
+        cv2.polylines(self.canvas, strokes, False, STROKE_COLOUR, STROKE_THICKNESS)
+        cv2.polylines(self.mask, strokes, False, 255, STROKE_THICKNESS)
+
+    def update(self, frame, points):
+        if self.canvas is None or self.canvas.shape != frame.shape:
+            self.canvas = np.zeros_like(frame)
+            self.mask = np.zeros(frame.shape[:2], dtype=np.uint8)
+            self.redraw()
+            if self.autosaver is not None:
+                height, width = frame.shape[:2]
+                self.autosaver.size = (width, height)
+
+        self.eraser = None
+        features = get_features(points)
+        for is_pinching, pointer in zip(features[PINCH], features[PINCH_POINTER]):
+            pointer = fraction_to_pixels(frame, pointer[0], pointer[1])
+            pointer = (int(pointer[0]), int(pointer[1]))
+            if self.erasing:
+                self.eraser = pointer
+                if is_pinching:
+                    self.erase(pointer)
+            elif is_pinching:
+                self.was_drawing = True
+                stroke = self.drawing[-1]
+                if stroke:
+                    self.draw_segment(stroke.last, pointer)
+                stroke.add(pointer)
+            elif self.was_drawing:
+                self.finish_stroke()
+
+    def erase(self, pointer):
+        touched = [
+            stroke
+            for stroke in self.drawing
+            if stroke and stroke.distance(pointer) <= ERASER_RADIUS
+        ]
+        if touched:
+            self.remove_strokes(touched)
+
+    def render(self, frame):
+        if self.canvas is None:
+            return
+        # the strokes, in one go
+        cv2.copyTo(self.canvas, self.mask, frame)
+        if self.eraser is not None:
+            cv2.circle(frame, self.eraser, ERASER_RADIUS, (255, 255, 255), 2)
+
+    def handle_key(self, key):
+        # reset if 'r' is pressed
+        if key == ord("r"):
+            self.was_drawing = False
+            self.drawing = [self.new_stroke()]
+            if self.autosaver is not None:
+                self.autosaver.cleared()
+            self.redraw()
+        elif key == ord("u"):
+            # the stroke being drawn, or the last one finished
+            finished = [stroke for stroke in self.drawing if stroke]
+            if finished:
+                self.was_drawing = False
+                self.remove_strokes(finished[-1:])
+        elif key == ord("e"):
+            self.erasing = not self.erasing
+            if self.was_drawing:
+                self.finish_stroke()
+
+    def close(self):
+        if self.autosaver is not None:
+            # keep the stroke that was being drawn when the app quit
+            self.finish_stroke()
+            self.autosaver.close()
+
+
+def create_app():
+    path = get_options().autosave
+    return DrawApp(
+        None
+        if path is None
+        else StrokeAutosaver(path, colour=STROKE_COLOUR, thickness=STROKE_THICKNESS)
+    )
+
+
+if __name__ == "__main__":
+    Runtime([create_app()]).run()
@@ -9,8 +9,11 @@ import math
 
 import cv2
 import mediapipe as mp
+import numpy as np
 
-from common.hands import EasyHandLandmarker, atan2, draw_landmarks, fraction_to_pixels
+from common.gestures import all_of, angle, get_features
+from common.hands import fraction_to_pixels
+from common.runtime import GestureApp, Runtime
 
 FRAMES_TO_RELOAD = 15
 MAX_AMMO = 10
@@ -19,132 +22,114 @@ RANGE = 300
 HandLandmark = mp.solutions.hands.HandLandmark
 
 
-def is_gun(landmarks):
-    index_tip = landmarks[HandLandmark.INDEX_FINGER_TIP]
-    index_mcp = landmarks[HandLandmark.INDEX_FINGER_MCP]
-    thumb_tip = landmarks[HandLandmark.THUMB_TIP]
-    thumb_cmc = landmarks[HandLandmark.THUMB_CMC]
-    middle_dip = landmarks[HandLandmark.MIDDLE_FINGER_DIP]
-    middle_pip = landmarks[HandLandmark.MIDDLE_FINGER_PIP]
-    ring_dip = landmarks[HandLandmark.RING_FINGER_DIP]
-    ring_pip = landmarks[HandLandmark.RING_FINGER_PIP]
-    pinky_dip = landmarks[HandLandmark.PINKY_DIP]
-    pinky_pip = landmarks[HandLandmark.PINKY_PIP]
-
-    index_dir = atan2(index_mcp, index_tip)
-    middle_dir = atan2(middle_pip, middle_dip)
-    ring_dir = atan2(ring_pip, ring_dip)
-    pinky_dir = atan2(pinky_pip, pinky_dip)
-    thumb_dir = atan2(thumb_cmc, thumb_tip)
-
-    right_angled_gun = abs(thumb_dir - index_dir) < (3 / 4) * math.pi
-    three_fingers_behind = all(
-        abs(finger_dir - index_dir) > 3 * math.pi / 4
-        for finger_dir in (middle_dir, ring_dir, pinky_dir)
+INDEX_DIRECTION = angle(HandLandmark.INDEX_FINGER_MCP, HandLandmark.INDEX_FINGER_TIP)
+THUMB_TO_INDEX = abs(
+    angle(HandLandmark.THUMB_CMC, HandLandmark.THUMB_TIP) - INDEX_DIRECTION
+)
+GUN = (THUMB_TO_INDEX < (3 / 4) * math.pi) & all_of(
+    # three fingers behind
+    *(
+        abs(angle(pip, dip) - INDEX_DIRECTION) > 3 * math.pi / 4
+        for pip, dip in [
+            (HandLandmark.MIDDLE_FINGER_PIP, HandLandmark.MIDDLE_FINGER_DIP),
+            (HandLandmark.RING_FINGER_PIP, HandLandmark.RING_FINGER_DIP),
+            (HandLandmark.PINKY_PIP, HandLandmark.PINKY_DIP),
+        ]
     )
-
-    if not (right_angled_gun and three_fingers_behind):
-        return None
-
-    is_shooting = abs(thumb_dir - index_dir) < (3 / 16) * math.pi
-    return index_dir, is_shooting
-
-
-landmarker = EasyHandLandmarker(num_hands=2)
-
-
-# Initialize OpenCV
-cap = cv2.VideoCapture(2)  # Use 0 for the default camera
-ammo = MAX_AMMO
-just_shot = False
-reload_frames = FRAMES_TO_RELOAD
-
-while cap.isOpened():
-    ret, frame = cap.read()
-    if not ret:
-        break
-
-    frame = cv2.flip(frame, 1)
-
-    # Process the frame with MediaPipe Hands
-    landmarker.process_frame(frame)
-    results = landmarker.get_latest_result()
-
-    gun_present = False
-
-    if results:
-        draw_landmarks(frame, results)
-        for landmarks in results.hand_landmarks:
-            gun = is_gun(landmarks)
-            if gun is not None:
-                gun_present = True
-                index_tip = landmarks[HandLandmark.INDEX_FINGER_TIP]
-                direction, is_shooting = gun
-                gun_x, gun_y = fraction_to_pixels(frame, index_tip.x, index_tip.y)
-                if ammo > 0:
-                    cv2.line(
-                        frame,
-                        (int(gun_x), int(gun_y)),
-                        (
-                            int(gun_x + math.cos(direction) * RANGE),
-                            int(gun_y + math.sin(direction) * RANGE),
-                        ),
-                        (0, 0, 255) if is_shooting else (255, 0, 0),
-                        3,
-                    )
-
-                if is_shooting and not just_shot and ammo > 0:
-                    just_shot = True
-                    ammo -= 1
-                elif not is_shooting and just_shot:
-                    just_shot = False
-
-                cv2.putText(
+)
+SHOOTING = THUMB_TO_INDEX < (3 / 16) * math.pi
+
+
+class GunApp(GestureApp):
+    num_hands = 2
+
+    def __init__(self):
+        self.ammo = MAX_AMMO
+        self.just_shot = False
+        self.reload_frames = FRAMES_TO_RELOAD
+        # (x, y, direction, is_shooting, loaded, ammo) of each gun this frame
+        self.guns = []
+        self.reload_progress = None
+
+    def update(self, frame, points):
+        self.guns = []
+        features = get_features(points)
+        guns = features[GUN]
+        directions, shooting = features[INDEX_DIRECTION], features[SHOOTING]
+        for hand in np.flatnonzero(guns):
+            index_tip = points[hand, HandLandmark.INDEX_FINGER_TIP]
+            direction, is_shooting = directions[hand], shooting[hand]
+            gun_x, gun_y = fraction_to_pixels(frame, index_tip[0], index_tip[1])
+            loaded = self.ammo > 0
+
+            if is_shooting and not self.just_shot and self.ammo > 0:
+                self.just_shot = True
+                self.ammo -= 1
+            elif not is_shooting and self.just_shot:
+                self.just_shot = False
+
+            self.guns.append((gun_x, gun_y, direction, is_shooting, loaded, self.ammo))
+
+        self.reload_progress = None
+        if self.guns:
+            self.reload_frames = FRAMES_TO_RELOAD
+        elif self.ammo < MAX_AMMO:
+            self.reload_progress = 1 - self.reload_frames / FRAMES_TO_RELOAD
+            self.reload_frames = self.reload_frames - 1
+            if self.reload_frames == 0:
+                self.reload_frames = FRAMES_TO_RELOAD
+                self.ammo = MAX_AMMO
+
+    def render(self, frame):
+        for gun_x, gun_y, direction, is_shooting, loaded, ammo in self.guns:
+            if loaded:
+                cv2.line(
                     frame,
-                    str(ammo) if ammo > 0 else "reload!",
+                    (int(gun_x), int(gun_y)),
                     (
-                        int(
-                            gun_x
-                            + math.cos(direction) * 20
-                            + math.cos(direction + math.pi / 2) * 20
-                        ),
-                        int(
-                            gun_y
-                            + math.sin(direction) * 20
-                            + math.sin(direction + math.pi / 2) * 20
-                        ),
+                        int(gun_x + math.cos(direction) * RANGE),
+                        int(gun_y + math.sin(direction) * RANGE),
                     ),
-                    cv2.FONT_HERSHEY_SIMPLEX,
-                    1,
-                    (0, 0, 255) if ammo == 0 else (255, 255, 255),
+                    (0, 0, 255) if is_shooting else (255, 0, 0),
                     3,
                 )
 
-    if gun_present:
-        reload_frames = FRAMES_TO_RELOAD
-    elif ammo < MAX_AMMO:
-        cv2.putText(
-            frame,
-            f"reloading... ({int((1 - reload_frames / FRAMES_TO_RELOAD) * 100)}%)",
-            (50, 50),
-            cv2.FONT_HERSHEY_SIMPLEX,
-            1,
-            (0, 0, 255),
-            3,
-        )
-        reload_frames = reload_frames - 1
-        if reload_frames == 0:
-            reload_frames = FRAMES_TO_RELOAD
-            ammo = MAX_AMMO
-
-    # Display the resulting frame
-    cv2.imshow("handiwork", frame)
-
-    # Break the loop if 'q' is pressed
-    if cv2.waitKey(1) & 0xFF == ord("q"):
-        break
-
-# Release the VideoCapture and close all windows
-cap.release()
-cv2.destroyAllWindows()
-landmarker.close()
+            cv2.putText(
+                frame,
+                str(ammo) if ammo > 0 else "reload!",
+                (
+                    int(
+                        gun_x
+                        + math.cos(direction) * 20
+                        + math.cos(direction + math.pi / 2) * 20
+                    ),
+                    int(
+                        gun_y
+                        + math.sin(direction) * 20
+                        + math.sin(direction + math.pi / 2) * 20
+                    ),
+                ),
+                cv2.FONT_HERSHEY_SIMPLEX,
+                1,
+                (0, 0, 255) if ammo == 0 else (255, 255, 255),
+                3,
+            )
+
+        if self.reload_progress is not None:
+            cv2.putText(
+                frame,
+                f"reloading... ({int(self.reload_progress * 100)}%)",
+                (50, 50),
+                cv2.FONT_HERSHEY_SIMPLEX,
+                1,
+                (0, 0, 255),
+                3,
+            )
+
+
+def create_app():
+    return GunApp()
+
+
+if __name__ == "__main__":
+    Runtime([create_app()]).run()
@@ -0,0 +1,133 @@
+"""
+LAUNCHER
+--------
+
+Every demo in one window, switching between them without reloading the model or reopening the camera.
+
+Press Tab to go to the next demo, or 1-9 to pick one. You can also pinch and hold in the top right corner of the screen for a second to move on to the next demo.
+
+Each demo is started the first time it's shown, and keeps its state when you switch away from it.
+"""
+
+import time
+
+# taken before anything heavy is imported, so startup times include imports
+LAUNCH_TIME = time.monotonic()
+
+import cv2
+
+from common.gestures import PINCH, PINCH_POINTER, get_features
+from common.hands import fraction_to_pixels
+from common.runtime import GestureApp, Runtime, load_app
+
+DEMOS = [
+    "binary",
+    "draw",
+    "rect",
+    "ball",
+    "gun",
+    "knob",
+    "sao",
+    "scroll",
+    "slider",
+    "music",
+    "actions",
+]
+NEXT_KEY = 9  # tab
+# size of the top right corner that switches demos, as a fraction of the frame
+HOTSPOT_SIZE = 0.15
+HOLD_SECONDS = 1.0
+
+
+class LauncherApp(GestureApp):
+    def __init__(self, names):
+        self.names = names
+        self.apps = {}
+        self.index = 0
+        self.hold_start = None
+        self.hold_progress = 0
+        self.current = self.load(0)
+
+    def load(self, index):
+        name = self.names[index]
+        if name not in self.apps:
+            self.apps[name] = load_app(name)
+        return self.apps[name]
+
+    def switch(self, index):
+        self.index = index % len(self.names)
+        self.current = self.load(self.index)
+        self.hold_start = None
+
+    def update(self, frame, points):
+        features = get_features(points)
+        in_hotspot = any(
+            is_pinching and x > 1 - HOTSPOT_SIZE and y < HOTSPOT_SIZE
+            for is_pinching, (x, y) in zip(
+                features[PINCH].tolist(), features[PINCH_POINTER].tolist()
+            )
+        )
+        now = time.monotonic()
+        if not in_hotspot:
+            self.hold_start = None
+            self.hold_progress = 0
+        elif self.hold_start is None:
+            self.hold_start = now
+        else:
+            self.hold_progress = (now - self.hold_start) / HOLD_SECONDS
+            if self.hold_progress >= 1:
+                self.switch(self.index + 1)
+                self.hold_progress = 0
+                # don't switch again until the pinch is released
+                self.hold_start = float("inf")
+
+        if len(points) > self.current.num_hands:
+            points = points[: self.current.num_hands]
+        self.current.update(frame, points)
+
+    def render(self, frame):
+        self.current.render(frame)
+
+        height, width, _ = frame.shape
+        label = f"{self.index + 1}/{len(self.names)} {self.names[self.index]}"
+        (text_width, _), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 1)
+        cv2.putText(
+            frame,
+            label,
+            (width - text_width - 10, height - 10),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            0.6,
+            (255, 255, 255),
+            1,
+        )
+
+        x0, y1 = fraction_to_pixels(frame, 1 - HOTSPOT_SIZE, HOTSPOT_SIZE)
+        cv2.rectangle(frame, (int(x0), 0), (width - 1, int(y1)), (255, 255, 255), 1)
+        if 0 < self.hold_progress < 1:
+            center = (int((x0 + width) / 2), int(y1 / 2))
+            cv2.ellipse(
+                frame,
+                center,
+                (20, 20),
+                -90,
+                0,
+                360 * self.hold_progress,
+                (0, 255, 0),
+                4,
+            )
+
+    def handle_key(self, key):
+        if key == NEXT_KEY:
+            self.switch(self.index + 1)
+        elif ord("1") <= key < ord("1") + min(9, len(self.names)):
+            self.switch(key - ord("1"))
+        else:
+            self.current.handle_key(key)
+
+    def close(self):
+        for app in self.apps.values():
+            app.close()
+
+
+if __name__ == "__main__":
+    Runtime([LauncherApp(DEMOS)], start_time=LAUNCH_TIME).run()
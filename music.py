@@ -11,23 +11,21 @@ Hold your index finger and thumb together and drag up or down to adjust volume.
 
 Note: This script requires that:
 - You are on Linux
-- You have `pamixer` and `playerctl` installed
+- You have `playerctl` and either `pactl` or `wpctl` installed
 """
 
-import subprocess
 import time
 
 import cv2
 import mediapipe as mp
 
+from common.dispatch import get_dispatcher
+from common.gestures import PINCH, PINCH_POINTER, get_features
 from common.hands import (
-    EasyHandLandmarker,
     dist_between,
-    draw_landmarks,
     fraction_to_pixels,
-    get_pinch_pointer,
-    is_pinch,
 )
+from common.runtime import GestureApp, Runtime
 from common.volume import get_volume, set_volume
 
 mp_hands = mp.solutions.hands
@@ -36,97 +34,75 @@ TAP_DELAY_SECONDS = 0.4
 VOLUME_SENSITIVITY = 0.3
 START_VOLUME_ADJUST_DIST = 50
 
-landmarker = EasyHandLandmarker()
 
-# Initialize OpenCV
-cap = cv2.VideoCapture(2)  # Use 0 for the default camera
-gesture_origin = None
-is_dragging = False
-original_volume = None
-num_taps = 0
-last_tap = None
+class MusicApp(GestureApp):
+    def __init__(self):
+        self.gesture_origin = None
+        self.is_dragging = False
+        self.original_volume = None
+        self.num_taps = 0
+        self.last_tap = None
 
-while cap.isOpened():
-    ret, frame = cap.read()
-    if not ret:
-        break
-
-    frame = cv2.flip(frame, 1)
-
-    # Process the frame with MediaPipe Hands
-    landmarker.process_frame(frame)
-    results = landmarker.get_latest_result()
-
-    if results:
-        draw_landmarks(frame, results)
-        for landmarks in results.hand_landmarks:
-            if is_pinch(landmarks):
-                pointer = get_pinch_pointer(landmarks)
+    def update(self, frame, points):
+        features = get_features(points)
+        for is_pinching, pointer in zip(features[PINCH], features[PINCH_POINTER]):
+            if is_pinching:
                 pointer = fraction_to_pixels(frame, pointer[0], pointer[1])
 
-                if gesture_origin is None:
-                    gesture_origin = pointer
-                    num_taps += 1
-                    last_tap = time.time()
+                if self.gesture_origin is None:
+                    self.gesture_origin = pointer
+                    self.num_taps += 1
+                    self.last_tap = time.time()
                 elif (
-                    not is_dragging
-                    and dist_between(*pointer, *gesture_origin)
+                    not self.is_dragging
+                    and dist_between(*pointer, *self.gesture_origin)
                     > START_VOLUME_ADJUST_DIST
-                    or time.time() > TAP_DELAY_SECONDS + (last_tap or time.time())
+                    or time.time() > TAP_DELAY_SECONDS + (self.last_tap or time.time())
                 ):
-                    is_dragging = True
-                    last_tap = None
-                    num_taps = 0
-                    original_volume = get_volume()
-
-                if is_dragging:
-                    dy = gesture_origin[1] - pointer[1]
-                    set_volume(original_volume + dy * VOLUME_SENSITIVITY)
+                    self.is_dragging = True
+                    self.last_tap = None
+                    self.num_taps = 0
+                    self.original_volume = get_volume()
+
+                if self.is_dragging:
+                    dy = self.gesture_origin[1] - pointer[1]
+                    set_volume(self.original_volume + dy * VOLUME_SENSITIVITY)
             else:
-                gesture_origin = None
-                is_dragging = False
-
-    if last_tap is not None and gesture_origin is None:
-        if time.time() > TAP_DELAY_SECONDS + last_tap or num_taps >= 3:
-            if num_taps == 1:
-                print("play/pause")
-                subprocess.run(["playerctl", "play-pause"])
-            elif num_taps == 2:
-                print("next")
-                subprocess.run(["playerctl", "next"])
-            elif num_taps == 3:
-                print("prev")
-                subprocess.run(["playerctl", "previous"])
-
-            num_taps = 0
-            last_tap = None
-
-    if num_taps == 1:
-        cv2.putText(
-            frame, "play/pause", (10, 50), cv2.FONT_HERSHEY_DUPLEX, 1, (255, 0, 0), 2
-        )
-    elif num_taps == 2:
-        cv2.putText(frame, "next", (10, 50), cv2.FONT_HERSHEY_DUPLEX, 1, (255, 0, 0), 2)
-    elif num_taps == 3:
-        cv2.putText(frame, "prev", (10, 50), cv2.FONT_HERSHEY_DUPLEX, 1, (255, 0, 0), 2)
-    elif is_dragging:
-        cv2.putText(
-            frame,
-            "adjusting volume",
-            (10, 50),
-            cv2.FONT_HERSHEY_DUPLEX,
-            1,
-            (255, 0, 0),
-            2,
-        )
-
-    # Display the resulting frame
-    cv2.imshow("handiwork", frame)
-
-    # Break the loop if 'q' is pressed
-    if cv2.waitKey(1) & 0xFF == ord("q"):
-        break
-
-# Release the VideoCapture and close all windows
-cap.release()
-cv2.destroyAllWindows()
+                self.gesture_origin = None
+                self.is_dragging = False
+
+        if self.last_tap is not None and self.gesture_origin is None:
+            if time.time() > TAP_DELAY_SECONDS + self.last_tap or self.num_taps >= 3:
+                if self.num_taps == 1:
+                    print("play/pause")
+                    get_dispatcher().submit("play-pause", ["playerctl", "play-pause"])
+                elif self.num_taps == 2:
+                    print("next")
+                    get_dispatcher().submit("next", ["playerctl", "next"])
+                elif self.num_taps == 3:
+                    print("prev")
+                    get_dispatcher().submit("previous", ["playerctl", "previous"])
+
+                self.num_taps = 0
+                self.last_tap = None
+
+    def render(self, frame):
+        if self.num_taps == 1:
+            text = "play/pause"
+        elif self.num_taps == 2:
+            text = "next"
+        elif self.num_taps == 3:
+            text = "prev"
+        elif self.is_dragging:
+            text = "adjusting volume"
+        else:
+            return
+        cv2.putText(frame, text, (10, 50), cv2.FONT_HERSHEY_DUPLEX, 1, (255, 0, 0), 2)
+
+
+def create_app():
+    return MusicApp()
+
+
+if __name__ == "__main__":
+    Runtime([create_app()]).run()
@@ -9,76 +9,64 @@ Press 'r' to reset.
 
 import cv2
 
-from common.hands import (
-    EasyHandLandmarker,
-    dist_between,
-    draw_landmarks,
-    fraction_to_pixels,
-    get_pinch_pointer,
-    is_pinch,
-)
-
-landmarker = EasyHandLandmarker(num_hands=2)
-
-# Initialize OpenCV
-cap = cv2.VideoCapture(2)
-is_active = False
-last_rect = None
-rects = []
-
-while cap.isOpened():
-    ret, frame = cap.read()
-    if not ret:
-        break
-
-    frame = cv2.flip(frame, 1)
-
-    # Process the frame with MediaPipe Hands
-    landmarker.process_frame(frame)
-    results = landmarker.get_latest_result()
-
-    if results:
-        pointers = []
-        draw_landmarks(frame, results)
-        for landmarks in results.hand_landmarks:
-            if is_pinch(landmarks):
-                pointers.append(get_pinch_pointer(landmarks))
-
-        if len(pointers) == 2:
-            p1, p2 = pointers
-            p1x, p1y = p1
-            p2x, p2y = p2
-
-            if not is_active:
-                # check if the four fingers are close enough
-                if dist_between(p1x, p1y, p2x, p2y) <= 0.06:
-                    is_active = True
-
-            if is_active:
-                p1x, p1y = map(int, fraction_to_pixels(frame, p1x, p1y))
-                p2x, p2y = map(int, fraction_to_pixels(frame, p2x, p2y))
-                cv2.rectangle(frame, (p1x, p1y), (p2x, p2y), (0, 0, 255), 5)
-                last_rect = p1x, p1y, p2x, p2y
-
-        elif is_active:
-            is_active = False
-            rects.append(last_rect)
-
-    for x1, y1, x2, y2 in rects:
-        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 0, 255), 5)
-
-    # Display the resulting frame
-    cv2.imshow("handiwork", frame)
-
-    key = cv2.waitKey(1)
-    # reset if 'r' is pressed
-    if key & 0xFF == ord("r"):
-        rects = []
-    # Break the loop if 'q' is pressed
-    if key & 0xFF == ord("q"):
-        break
-
-# Release the VideoCapture and close all windows
-cap.release()
-cv2.destroyAllWindows()
-landmarker.close()
+from common.gestures import PINCH, PINCH_POINTER, get_features
+from common.hands import dist_between, fraction_to_pixels
+from common.runtime import GestureApp, Runtime
+from common.tracking import get_hand_tracker
+
+
+class RectApp(GestureApp):
+    num_hands = 2
+
+    def __init__(self):
+        self.is_active = False
+        # track IDs of the two hands drawing the rectangle
+        self.pair = None
+        self.last_rect = None
+        self.rects = []
+
+    def update(self, frame, points):
+        features = get_features(points)
+        pinching = features[PINCH]
+        pointers = dict(
+            zip(
+                get_hand_tracker().ids[: len(points)][pinching].tolist(),
+                features[PINCH_POINTER][pinching].tolist(),
+            )
+        )
+
+        if not self.is_active and len(pointers) == 2:
+            (p1x, p1y), (p2x, p2y) = pointers.values()
+            # check if the four fingers are close enough
+            if dist_between(p1x, p1y, p2x, p2y) <= 0.06:
+                self.is_active = True
+                self.pair = tuple(pointers)
+
+        if self.is_active and all(hand_id in pointers for hand_id in self.pair):
+            p1, p2 = (pointers[hand_id] for hand_id in self.pair)
+            p1x, p1y = map(int, fraction_to_pixels(frame, *p1))
+            p2x, p2y = map(int, fraction_to_pixels(frame, *p2))
+            self.last_rect = p1x, p1y, p2x, p2y
+
+        elif self.is_active:
+            self.is_active = False
+            self.pair = None
+            self.rects.append(self.last_rect)
+
+    def render(self, frame):
+        rects = self.rects + [self.last_rect] if self.is_active else self.rects
+        for x1, y1, x2, y2 in rects:
+            cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 0, 255), 5)
+
+    def handle_key(self, key):
+        # reset if 'r' is pressed
+        if key == ord("r"):
+            self.rects = []
+
+
+def create_app():
+    return RectApp()
+
+
+if __name__ == "__main__":
+    Runtime([create_app()]).run()
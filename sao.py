@@ -10,154 +10,151 @@ import math
 import cv2
 import mediapipe as mp
 
-from common.hands import (
-    EasyHandLandmarker,
-    dist_between,
-    draw_landmarks,
-    fingers_are_up,
-    fraction_to_pixels,
+from common.gestures import (
+    INDEX,
+    MIDDLE,
+    PINKY,
+    RING,
+    X,
+    Y,
+    all_of,
+    angle,
+    finger_up,
+    get_features,
+    landmark,
 )
+from common.hands import fraction_to_pixels
+from common.hittest import HitIndex
+from common.runtime import GestureApp, Runtime
 
 HandLandmark = mp.solutions.hands.HandLandmark
 
 LEFT_HANDED = False  # Change to True if using left hand.
 
+NUM_BUTTONS = 5
+BUTTON_REACH = 30
 
-def is_initial_gesture(landmarks):
-    middle_mcp = landmarks[HandLandmark.MIDDLE_FINGER_MCP]
-    wrist = landmarks[HandLandmark.WRIST]
-    angle = math.atan2(wrist.y - middle_mcp.y, wrist.x - middle_mcp.x)
 
-    required_fingers_are_up = fingers_are_up(landmarks)[1:] == [
-        True,
-        True,
-        False,
-        False,
-    ]
+FINGERTIPS = [
+    HandLandmark.INDEX_FINGER_TIP,
+    HandLandmark.MIDDLE_FINGER_TIP,
+    HandLandmark.RING_FINGER_TIP,
+    HandLandmark.PINKY_TIP,
+]
 
-    has_correct_angle = (
-        math.pi / 2 - math.pi / 6 < angle < 3 * math.pi / 2 + math.pi / 6
-    )
 
-    return required_fingers_are_up and has_correct_angle
-
-
-def is_final_gesture(landmarks):
-    index_tip = landmarks[HandLandmark.INDEX_FINGER_TIP]
-    index_mcp = landmarks[HandLandmark.INDEX_FINGER_MCP]
-    middle_tip = landmarks[HandLandmark.MIDDLE_FINGER_TIP]
-    middle_mcp = landmarks[HandLandmark.MIDDLE_FINGER_MCP]
-    return index_tip.y > index_mcp.y and middle_tip.y > middle_mcp.y
-
-
-def hand_fanned_right(landmarks):
-    index = landmarks[HandLandmark.INDEX_FINGER_TIP]
-    middle = landmarks[HandLandmark.MIDDLE_FINGER_TIP]
-    ring = landmarks[HandLandmark.RING_FINGER_TIP]
-    pinky = landmarks[HandLandmark.PINKY_TIP]
-    wrist = landmarks[HandLandmark.WRIST]
-
-    return all(point.x > wrist.x for point in [index, middle, ring, pinky])
-
-
-def hand_fanned_left(landmarks):
-    index = landmarks[HandLandmark.INDEX_FINGER_TIP]
-    middle = landmarks[HandLandmark.MIDDLE_FINGER_TIP]
-    ring = landmarks[HandLandmark.RING_FINGER_TIP]
-    pinky = landmarks[HandLandmark.PINKY_TIP]
-    wrist = landmarks[HandLandmark.WRIST]
-
-    return all(point.x < wrist.x for point in [index, middle, ring, pinky])
-
-
-def get_gesture_pointer(landmarks):
-    index = landmarks[HandLandmark.INDEX_FINGER_TIP]
-    # middle = landmarks[HandLandmark.MIDDLE_FINGER_TIP]
-    # return (index.x + middle.x) / 2, (index.y + middle.y) / 2
-    return index.x, index.y
-
-
-landmarker = EasyHandLandmarker()
-
-# Initialize OpenCV
-cap = cv2.VideoCapture(2)  # Use 0 for the default camera
-
-gesture_frames = 0
-menu_delay_frames = None
-menu_origin = None
-menu_animation_frame = 0
-
-while cap.isOpened():
-    ret, frame = cap.read()
-    if not ret:
-        break
+HAND_ANGLE = angle(HandLandmark.MIDDLE_FINGER_MCP, HandLandmark.WRIST)
+INITIAL_GESTURE = all_of(
+    finger_up(INDEX),
+    finger_up(MIDDLE),
+    ~finger_up(RING),
+    ~finger_up(PINKY),
+    # has correct angle
+    math.pi / 2 - math.pi / 6 < HAND_ANGLE,
+    HAND_ANGLE < 3 * math.pi / 2 + math.pi / 6,
+)
+FINAL_GESTURE = (
+    landmark(HandLandmark.INDEX_FINGER_TIP, Y)
+    > landmark(HandLandmark.INDEX_FINGER_MCP, Y)
+) & (
+    landmark(HandLandmark.MIDDLE_FINGER_TIP, Y)
+    > landmark(HandLandmark.MIDDLE_FINGER_MCP, Y)
+)
+FANNED_RIGHT = all_of(
+    *(landmark(tip, X) > landmark(HandLandmark.WRIST, X) for tip in FINGERTIPS)
+)
+FANNED_LEFT = all_of(
+    *(landmark(tip, X) < landmark(HandLandmark.WRIST, X) for tip in FINGERTIPS)
+)
 
-    frame = cv2.flip(frame, 1)
 
-    # Process the frame with MediaPipe Hands
-    landmarker.process_frame(frame)
-    results = landmarker.get_latest_result()
+def get_gesture_pointer(points):
+    index_x, index_y, _ = points[HandLandmark.INDEX_FINGER_TIP]
+    # middle_x, middle_y, _ = points[HandLandmark.MIDDLE_FINGER_TIP]
+    # return (index_x + middle_x) / 2, (index_y + middle_y) / 2
+    return index_x, index_y
+
+
+class SaoApp(GestureApp):
+    def __init__(self):
+        self.gesture_frames = 0
+        self.menu_delay_frames = None
+        self.menu_origin = None
+        self.menu_animation_frame = 0
+        self.menu_cursor = None
+        self.buttons = HitIndex()
+        self.hovered_button = None
+
+    def get_button_coords(self):
+        x, y = self.menu_origin
+        return [
+            (x, y - i * 60 - 32 + self.menu_animation_frame * 4)
+            for i in range(NUM_BUTTONS)
+        ]
+
+    def update(self, frame, points):
+        self.menu_cursor = None
+        features = get_features(points)
+        initial = features[INITIAL_GESTURE]
+        final = features[FINAL_GESTURE]
+        fanned_open = features[FANNED_LEFT if LEFT_HANDED else FANNED_RIGHT]
+        fanned_close = features[FANNED_RIGHT if LEFT_HANDED else FANNED_LEFT]
+        for hand, landmarks in enumerate(points):
+            if self.menu_origin is None:
+                if initial[hand]:
+                    self.gesture_frames = 3
+                elif self.gesture_frames > 0:
+                    self.gesture_frames -= 1
+
+                if final[hand] and self.gesture_frames > 0:
+                    self.gesture_frames = 0
+                    self.menu_delay_frames = 4
+
+                if self.menu_delay_frames is not None:
+                    self.menu_delay_frames -= 1
+                    if self.menu_delay_frames == 0:
+                        self.menu_origin = fraction_to_pixels(
+                            frame, *get_gesture_pointer(landmarks)
+                        )
+                        self.menu_delay_frames = None
+            else:
+                index_x, index_y, _ = landmarks[HandLandmark.INDEX_FINGER_TIP]
+                self.menu_cursor = fraction_to_pixels(frame, index_x, index_y)
 
-    menu_cursor = None
+                if fanned_open[hand]:
+                    self.gesture_frames = 3
+                elif self.gesture_frames > 0:
+                    self.gesture_frames -= 1
 
-    if results:
-        draw_landmarks(frame, results)
-        for landmarks in results.hand_landmarks:
-            if menu_origin is None:
-                if is_initial_gesture(landmarks):
-                    gesture_frames = 3
-                elif gesture_frames > 0:
-                    gesture_frames -= 1
-                else:
-                    gesture_origin = None
+                if fanned_close[hand] and self.gesture_frames > 0:
+                    self.menu_origin = None
+                    self.menu_animation_frame = 0
 
-                if is_final_gesture(landmarks) and gesture_frames > 0:
-                    gesture_frames = 0
-                    menu_delay_frames = 4
+        if self.menu_origin is not None and self.menu_animation_frame < 8:
+            self.menu_animation_frame += 1
 
-                if menu_delay_frames is not None:
-                    menu_delay_frames -= 1
-                    if menu_delay_frames == 0:
-                        menu_origin = get_gesture_pointer(landmarks)
-                        menu_origin = fraction_to_pixels(frame, *menu_origin)
-                        menu_delay_frames = None
-            else:
-                index_tip = landmarks[HandLandmark.INDEX_FINGER_TIP]
-                menu_cursor = fraction_to_pixels(frame, index_tip.x, index_tip.y)
-
-                if (hand_fanned_left if LEFT_HANDED else hand_fanned_right)(landmarks):
-                    gesture_frames = 3
-                elif gesture_frames > 0:
-                    gesture_frames -= 1
-
-                if (hand_fanned_right if LEFT_HANDED else hand_fanned_left)(
-                    landmarks
-                ) and gesture_frames > 0:
-                    menu_origin = None
-                    menu_animation_frame = 0
-
-    if menu_origin is not None:
-        if menu_animation_frame < 8:
-            menu_animation_frame += 1
-        for i in range(5):
-            x, y = (
-                menu_origin[0],
-                menu_origin[1] - i * 60 - 32 + menu_animation_frame * 4,
+        self.hovered_button = None
+        if self.menu_origin is not None and self.menu_cursor is not None:
+            self.buttons.set_circles(
+                range(NUM_BUTTONS), self.get_button_coords(), BUTTON_REACH
             )
+            self.hovered_button = self.buttons.hit(self.menu_cursor)
 
+    def render(self, frame):
+        if self.menu_origin is None:
+            return
+
+        for i, (x, y) in enumerate(self.get_button_coords()):
             cv2.circle(frame, (int(x), int(y)), 25, (0, 0, 0), -1)
             cv2.circle(frame, (int(x), int(y)), 20, (255, 255, 255), -1)
-            if menu_cursor is not None:
-                if dist_between(x, y, menu_cursor[0], menu_cursor[1]) < 30:
-                    cv2.circle(frame, (int(x), int(y)), 25, (255, 255, 255), -1)
-                    cv2.circle(frame, (int(x), int(y)), 20, (88, 178, 248), -1)
+            if i == self.hovered_button:
+                cv2.circle(frame, (int(x), int(y)), 25, (255, 255, 255), -1)
+                cv2.circle(frame, (int(x), int(y)), 20, (88, 178, 248), -1)
+
 
-    cv2.imshow("handiwork", frame)
+def create_app():
+    return SaoApp()
 
-    # handle keyboard input
-    if cv2.waitKey(1) & 0xFF == ord("q"):
-        break
 
-# Release the VideoCapture and close all windows
-cap.release()
-cv2.destroyAllWindows()
+if __name__ == "__main__":
+    Runtime([create_app()]).run()
@@ -12,29 +12,13 @@ import textwrap
 import cv2
 import mediapipe as mp
 
-from common.hands import (
-    EasyHandLandmarker,
-    draw_landmarks,
-    fraction_to_pixels,
-    get_pinch_pointer,
-    is_pinch,
-)
+from common.gestures import PINCH, PINCH_POINTER, get_features
+from common.hands import fraction_to_pixels
+from common.runtime import GestureApp, Runtime
 
 FRICTION_COEFF = 0.15
 
-landmarker = EasyHandLandmarker()
-
-
-# Initialize OpenCV
-cap = cv2.VideoCapture(2)  # Use 0 for the default camera
-
-old_pos = None
-last_pos = None
-current_pos = 0
-velocity = None
-is_scrolling = False
-scroll_origin = None
-lorem = textwrap.wrap(
+LOREM = textwrap.wrap(
     "\n".join(
         [
             "Lorem ipsum dolor sit amet, consectetur adipiscing elit. Suspendisse sed orci non eros tempor bibendum. Mauris mauris mauris, tempor non dignissim ut, placerat ac ex. Donec eu ornare dolor. Morbi aliquam gravida condimentum. Ut a turpis sit amet lectus dignissim congue eget dictum dui. Nam ex ipsum, dapibus id congue nec, ullamcorper nec lacus. Etiam in felis accumsan, volutpat felis ac, pretium nisi. Integer et neque ut tortor mollis finibus. Donec lacinia porta arcu, vitae pharetra nibh semper sit amet. Sed ac lobortis ligula, ut pretium enim. Vivamus ut ante metus. Cras libero arcu, imperdiet ut rutrum quis, laoreet ac turpis.",
@@ -47,77 +31,61 @@ lorem = textwrap.wrap(
     30,
 )
 
-while cap.isOpened():
-    ret, frame = cap.read()
-    if not ret:
-        break
-
-    frame = cv2.flip(frame, 1)
-
-    # Process the frame with MediaPipe Hands
-    landmarker.process_frame(frame)
-    results = landmarker.get_latest_result()
-
-    if results:
-        draw_landmarks(frame, results)
-        for landmarks in results.hand_landmarks:
-            pinching = is_pinch(landmarks)
-
-            if pinching and not is_scrolling:  # is scrolling
-                is_scrolling = True
-                old_pos = current_pos
-                scroll_origin = fraction_to_pixels(
-                    frame, *get_pinch_pointer(landmarks)
-                )[1]
-            elif pinching and is_scrolling:
-                last_pos = current_pos
-                current_pos = old_pos + (
-                    fraction_to_pixels(frame, *get_pinch_pointer(landmarks))[1]
-                    - scroll_origin
+
+class ScrollApp(GestureApp):
+    def __init__(self):
+        self.old_pos = None
+        self.last_pos = None
+        self.current_pos = 0
+        self.velocity = None
+        self.is_scrolling = False
+        self.scroll_origin = None
+
+    def update(self, frame, points):
+        features = get_features(points)
+        for pinching, pointer in zip(features[PINCH], features[PINCH_POINTER]):
+            if pinching and not self.is_scrolling:  # is scrolling
+                self.is_scrolling = True
+                self.old_pos = self.current_pos
+                self.scroll_origin = fraction_to_pixels(frame, *pointer)[1]
+            elif pinching and self.is_scrolling:
+                self.last_pos = self.current_pos
+                self.current_pos = self.old_pos + (
+                    fraction_to_pixels(frame, *pointer)[1] - self.scroll_origin
                 )
-            elif not pinching and is_scrolling:
-                is_scrolling = False
-                if last_pos is not None:
-                    velocity = current_pos - last_pos
-                old_pos = None
-                last_pos = None
-                scroll_origin = None
-    else:
-        if is_scrolling:
-            is_scrolling = False
-            if last_pos is not None:
-                velocity = current_pos - last_pos
-            old_pos = None
-            last_pos = None
-            scroll_origin = None
-
-    if not is_scrolling and velocity is not None:
-        current_pos += velocity
-        velocity *= 1 - FRICTION_COEFF
-
-    for i, line in enumerate(lorem):
-        cv2.putText(
-            frame,
-            line,
-            (0, int(current_pos) + i * 30),
-            cv2.FONT_HERSHEY_SIMPLEX,
-            1,
-            (0, 0, 255) if is_scrolling else (255, 0, 0),
-            2,
-        )
-
-    # Display the resulting frame
-    cv2.imshow("handiwork", frame)
-
-    # handle keyboard input
-    key = cv2.waitKey(1)
-    # reset if 'r' is pressed
-    if key & 0xFF == ord("r"):
-        current_pos = 0
-    # Break the loop if 'q' is pressed
-    if key & 0xFF == ord("q"):
-        break
-
-# Release the VideoCapture and close all windows
-cap.release()
-cv2.destroyAllWindows()
+            elif not pinching and self.is_scrolling:
+                self.is_scrolling = False
+                if self.last_pos is not None:
+                    self.velocity = self.current_pos - self.last_pos
+                self.old_pos = None
+                self.last_pos = None
+                self.scroll_origin = None
+
+        if not self.is_scrolling and self.velocity is not None:
+            self.current_pos += self.velocity
+            self.velocity *= 1 - FRICTION_COEFF
+
+    def render(self, frame):
+        for i, line in enumerate(LOREM):
+            cv2.putText(
+                frame,
+                line,
+                (0, int(self.current_pos) + i * 30),
+                cv2.FONT_HERSHEY_SIMPLEX,
+                1,
+                (0, 0, 255) if self.is_scrolling else (255, 0, 0),
+                2,
+            )
+
+    def handle_key(self, key):
+        # reset if 'r' is pressed
+        if key == ord("r"):
+            self.current_pos = 0
+
+
+def create_app():
+    return ScrollApp()
+
+
+if __name__ == "__main__":
+    Runtime([create_app()]).run()
@@ -4,23 +4,21 @@ SLIDER
 
 Pinch and drag the slider handle to change the volume.
 
-Note: This script requires that PulseAudio and `pamixer` is installed. You can change what the slider does by modifying the `callback` argument in the Slider constructor.
+Note: This script requires `pactl` (PulseAudio or PipeWire) or `wpctl` (PipeWire), see common/volume.py. You can change what the slider does by modifying the `callback` argument in the Slider constructor.
 """
 
 import cv2
-import mediapipe as mp
-
-from common.hands import (
-    EasyHandLandmarker,
-    dist_between,
-    draw_landmarks,
-    fraction_to_pixels,
-    get_pinch_pointer,
-    is_pinch,
-    pixels_to_fraction,
-)
+
+from common.gestures import PINCH, PINCH_POINTER, get_features
+from common.hands import fraction_to_pixels
+from common.hittest import RELEASED, HitIndex, PinchGrabs
+from common.runtime import GestureApp, Runtime
+from common.tracking import get_hand_tracker
 from common.volume import get_volume, set_volume
 
+# how near the handle a pinch grabs it, as a fraction of the frame's width
+GRAB_DISTANCE = 0.06
+
 
 class Slider:
     def __init__(self, x, y1, y2, callback, value=0):
@@ -30,25 +28,31 @@ class Slider:
         self.callback = callback
         self.value = value
         self.is_active = False
+        self.index = HitIndex()
+        # only the hand that grabbed the handle moves it
+        self.grabs = PinchGrabs(self.index)
 
     def get_handle_coords(self):
         return self.x, self.y1 + int((self.y2 - self.y1) * self.value)
 
-    def update(self, frame, landmarks):
-        if is_pinch(landmarks):
-            px, py = get_pinch_pointer(landmarks)
-            hx, hy = pixels_to_fraction(frame, *self.get_handle_coords())
+    def update(self, frame, hand_id, is_pinching, pointer):
+        self.index.set_circle(
+            "handle", self.get_handle_coords(), GRAB_DISTANCE * frame.shape[1]
+        )
+        pointer = fraction_to_pixels(frame, *pointer)
+        grab = self.grabs.update(hand_id, is_pinching, pointer)
+        self.is_active = bool(self.grabs.holding)
+        if grab is None or grab.state == RELEASED:
+            return
 
-            if dist_between(px, py, hx, hy) <= 0.06:
-                self.is_active = True
+        py = pointer[1]
+        self.value = (py - self.y1) / (self.y2 - self.y1)
+        self.value = max(0, min(1, self.value))
+        self.callback(self.value)
 
-            if self.is_active:
-                px, py = fraction_to_pixels(frame, px, py)
-                self.value = (py - self.y1) / (self.y2 - self.y1)
-                self.value = max(0, min(1, self.value))
-                self.callback(self.value)
-        elif self.is_active:
-            self.is_active = False
+    def drop(self, hand_ids):
+        self.grabs.drop(hand_ids)
+        self.is_active = bool(self.grabs.holding)
 
     def render(self, frame):
         cv2.putText(
@@ -77,39 +81,30 @@ class Slider:
         )
 
 
-landmarker = EasyHandLandmarker()
-
-# Initialize OpenCV
-cap = cv2.VideoCapture(2)  # Use 0 for the default camera
-slider = Slider(
-    100, 400, 100, lambda val: set_volume(int(val * 100)), get_volume() / 100
-)
+class SliderApp(GestureApp):
+    def __init__(self, slider):
+        self.slider = slider
 
-while cap.isOpened():
-    ret, frame = cap.read()
-    if not ret:
-        break
+    def update(self, frame, points):
+        tracker = get_hand_tracker()
+        features = get_features(points)
+        for hand_id, is_pinching, pointer in zip(
+            tracker.ids, features[PINCH], features[PINCH_POINTER]
+        ):
+            self.slider.update(frame, hand_id, is_pinching, pointer)
+        self.slider.drop(tracker.lost)
 
-    frame = cv2.flip(frame, 1)
-
-    # Process the frame with MediaPipe Hands
-    landmarker.process_frame(frame)
-    results = landmarker.get_latest_result()
+    def render(self, frame):
+        self.slider.render(frame)
 
-    if results:
-        draw_landmarks(frame, results)
-        for landmarks in results.hand_landmarks:
-            slider.update(frame, landmarks)
 
-    slider.render(frame)
-    # Display the resulting frame
-    cv2.imshow("handiwork", frame)
+def create_app():
+    return SliderApp(
+        Slider(
+            100, 400, 100, lambda val: set_volume(int(val * 100)), get_volume() / 100
+        )
+    )
 
-    # Break the loop if 'q' is pressed
-    if cv2.waitKey(1) & 0xFF == ord("q"):
-        break
 
-# Release the VideoCapture and close all windows
-cap.release()
-cv2.destroyAllWindows()
-landmarker.close()
+if __name__ == "__main__":
+    Runtime([create_app()]).run()